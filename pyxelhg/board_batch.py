@@ -0,0 +1,116 @@
+try:
+    import numpy as np
+except ImportError:  # numpy がない環境 (Web 版など) では使えない
+    np = None
+
+EMPTY = -1
+
+# --------------------------------------------------
+#  NumPy による候補盤面のまとめ評価
+#  (batch, rows, cols) の配列で多数の盤面を一度に扱い、
+#  連結成分のラベル付け・塊の大きさ・孤立セル数・色ごとの個数を
+#  少ない配列演算で求める。ソルバに渡す前の安い順位付けに使う
+# --------------------------------------------------
+
+
+def available():
+    return np is not None
+
+
+def generate_candidate_batch(generator, batch, rows, cols, colors,
+                             min_block_size, max_block_size):
+    """
+    BoardGenerator の「大きめブロック」方式で batch 枚作り、1つの配列にまとめる。
+    """
+    boards = np.empty((batch, rows, cols), dtype=np.int8)
+    for i in range(batch):
+        boards[i] = generator._generate_blocky_board(
+            rows, cols, colors,
+            min_block_size=min_block_size,
+            max_block_size=max_block_size)
+    return boards
+
+
+def label_components(boards):
+    """
+    上下左右でつながる同色セルに同じラベルを付ける。
+    ラベルは成分内で最小の「全体での通し番号」で、空セルは batch*rows*cols。
+    最小値の伝播とポインタジャンプを、変化がなくなるまで繰り返す。
+    """
+    batch, rows, cols = boards.shape
+    total = batch * rows * cols
+    empty = boards == EMPTY
+    labels = np.arange(total, dtype=np.int64).reshape(batch, rows, cols)
+    labels[empty] = total
+
+    same_v = (boards[:, 1:, :] == boards[:, :-1, :]) & ~empty[:, 1:, :]
+    same_h = (boards[:, :, 1:] == boards[:, :, :-1]) & ~empty[:, :, 1:]
+
+    while True:
+        new = labels.copy()
+        # 縦横の隣と比べて小さい方のラベルをもらう
+        np.minimum(new[:, 1:, :], np.where(same_v, labels[:, :-1, :], total),
+                   out=new[:, 1:, :])
+        np.minimum(new[:, :-1, :], np.where(same_v, labels[:, 1:, :], total),
+                   out=new[:, :-1, :])
+        np.minimum(new[:, :, 1:], np.where(same_h, labels[:, :, :-1], total),
+                   out=new[:, :, 1:])
+        np.minimum(new[:, :, :-1], np.where(same_h, labels[:, :, 1:], total),
+                   out=new[:, :, :-1])
+        # ラベルはセルの通し番号なので、そのセルのラベルへ飛ぶ (ポインタジャンプ)
+        flat = new.ravel()
+        jumped = np.where(empty, total, flat[np.minimum(new, total - 1)])
+        if np.array_equal(jumped, labels):
+            return labels
+        labels = jumped
+
+
+def batch_statistics(boards, colors):
+    """
+    盤面の配列 (batch, rows, cols) から安い統計をまとめて求める。
+    戻り値は配列の辞書:
+      labels: 連結成分のラベル
+      component_sizes: 各セルが属する成分の大きさ (空セルは 0)
+      group_count: 2セル以上の塊の数
+      singletons: 孤立セルの数
+      largest_group: 最大の塊の大きさ
+      color_histogram: (batch, colors) の色ごとのセル数
+      dead: ちょうど1セルしかない色があり、絶対に解けない盤面
+    """
+    batch, rows, cols = boards.shape
+    total = batch * rows * cols
+    empty = boards == EMPTY
+    labels = label_components(boards)
+
+    sizes = np.bincount(labels.ravel(), minlength=total + 1)
+    sizes[total] = 0
+    component_sizes = sizes[labels]
+
+    is_root = labels == np.arange(total).reshape(batch, rows, cols)
+    group_count = (is_root & (component_sizes >= 2)).sum(axis=(1, 2))
+    singletons = (component_sizes == 1).sum(axis=(1, 2))
+    largest_group = component_sizes.max(axis=(1, 2))
+
+    offsets = (np.arange(batch) * colors).reshape(batch, 1, 1)
+    histogram = np.bincount((boards.astype(np.int64) + offsets)[~empty],
+                            minlength=batch * colors).reshape(batch, colors)
+
+    return {
+        "labels": labels,
+        "component_sizes": component_sizes,
+        "group_count": group_count,
+        "singletons": singletons,
+        "largest_group": largest_group,
+        "color_histogram": histogram,
+        "dead": (histogram == 1).any(axis=1),
+    }
+
+
+def rank_candidates(stats):
+    """
+    有望な順に並べた添字を返す。解けないと分かっている盤面は含めない。
+    孤立セルが少なく、塊が多い盤面ほど先。
+    """
+    score = stats["singletons"] - stats["group_count"]
+    order = np.argsort(score, kind="stable")
+    return [int(i) for i in order if not stats["dead"][i]]
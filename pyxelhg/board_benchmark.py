@@ -0,0 +1,188 @@
+import argparse
+import json
+import platform
+import time
+
+from board_generator import BoardGenerator
+from difficulty import DIFFICULTY_LEVELS
+
+# --------------------------------------------------
+#  盤面生成のベンチマーク
+#  難易度ごとに決まった seed の列で盤面を作り、
+#  解ける割合・所要時間の分位点・時間切れの割合・ソルバの速さを JSON に書き出す。
+#  コミットごとの結果を diff すれば性能の後退に気づける
+# --------------------------------------------------
+
+
+def percentile(values, p):
+    """
+    最近傍順位法による p パーセンタイル (values が空なら 0)。
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))  # ceil(n * p / 100)
+    return ordered[int(rank) - 1]
+
+
+def benchmark_preset(generator, settings, seeds, timeout=3, method="search"):
+    """
+    1つの難易度について seed ごとに盤面を1枚ずつ作り、結果をまとめた辞書を返す。
+    置換表は盤面ごとに空にして、実行順で結果が変わらないようにする。
+    """
+    rows = settings["grid_rows"]
+    cols = settings["grid_cols"]
+    colors = settings["colors"]
+    latencies = []
+    solvable = 0
+    timeouts = 0
+    attempts = 0
+    nodes = 0
+    solver_seconds = 0.0
+
+    for seed in seeds:
+        generator.transposition_table.clear()
+        started = time.perf_counter()
+        generator.generate_filled_solvable_board(rows, cols, colors, timeout=timeout,
+                                                 method=method, seed=seed)
+        latencies.append(time.perf_counter() - started)
+        stats = generator.last_stats
+        solvable += generator.last_board_verified
+        timeouts += stats.reason == "timeout"
+        attempts += len(stats.attempts)
+        nodes += stats.nodes
+        # 候補の生成を含めず、ソルバの時間だけで割る (生成方式で意味が変わらないように)
+        solver_seconds += sum(a.solve_seconds for a in stats.attempts)
+
+    count = len(latencies)
+    return {
+        "rows": rows,
+        "cols": cols,
+        "colors": colors,
+        "boards": count,
+        "solvable_rate": solvable / count if count else 0.0,
+        "timeout_rate": timeouts / count if count else 0.0,
+        "attempts_per_board": attempts / count if count else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies, default=0.0),
+        "nodes": nodes,
+        "nodes_per_sec": nodes / solver_seconds if solver_seconds else 0.0,
+    }
+
+
+def benchmark_stream(generator, settings, boards, seed=0, timeout=None):
+    """
+    iter_solvable_boards から boards 枚取り出し、benchmark_preset と同じ形の辞書を返す。
+    所要時間は1枚ごとの間隔 (前の盤面を受け取ってから次を受け取るまで)。
+    時間切れの割合は、ソルバに渡した候補のうち時間切れになったものの割合。
+    段ごとの件数と時間も "pipeline" に入れる。
+    timeout は候補1枚あたりのソルバの秒数で、None なら調整済みの candidate_timeout。
+    """
+    rows = settings["grid_rows"]
+    cols = settings["grid_cols"]
+    colors = settings["colors"]
+    if timeout is None:
+        timeout = generator.generation_params(rows, cols, colors)["candidate_timeout"] or 3
+    generator.transposition_table.clear()
+    stream = generator.iter_solvable_boards(rows, cols, colors, timeout=timeout, seed=seed)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(boards):
+        next(stream)
+        now = time.perf_counter()
+        latencies.append(now - started)
+        started = now
+
+    pipeline = generator.last_pipeline_stats.to_dict()
+    counts = pipeline["counts"]
+    tried = counts["candidates"] + counts["repaired"]
+    solver_runs = tried - counts["prefiltered"]
+    return {
+        "rows": rows,
+        "cols": cols,
+        "colors": colors,
+        "boards": boards,
+        "candidate_timeout": timeout,
+        "solvable_rate": 1.0,
+        "timeout_rate": counts["unknown"] / solver_runs if solver_runs else 0.0,
+        "attempts_per_board": tried / boards if boards else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies, default=0.0),
+        "nodes": pipeline["nodes"],
+        "nodes_per_sec": (pipeline["nodes"] / pipeline["seconds"]["solve"]
+                          if pipeline["seconds"]["solve"] else 0.0),
+        "boards_per_sec": pipeline["boards_per_sec"],
+        "pipeline": pipeline,
+    }
+
+
+def run_benchmark(presets=None, boards=20, seed=0, timeout=None, method="search"):
+    """
+    presets (DIFFICULTY_LEVELS のキー、省略時は全部) を順に測る。
+    seed から seed + boards - 1 までの seed を全難易度で共通に使う。
+    method="stream" なら iter_solvable_boards の連続生成を seed で1回だけ初期化して測る。
+    timeout は "stream" では候補1枚あたりの秒数 (None なら調整済みの candidate_timeout)、
+    それ以外では1枚あたりの秒数 (None なら 3)。
+    """
+    seeds = list(range(seed, seed + boards))
+    results = {
+        "config": {
+            "boards": boards,
+            "seed": seed,
+            "timeout": timeout,
+            "method": method,
+            "python": platform.python_version(),
+        },
+        "presets": {},
+    }
+    generator = BoardGenerator()
+    for key in presets or DIFFICULTY_LEVELS:
+        if method == "stream":
+            results["presets"][key] = benchmark_stream(
+                generator, DIFFICULTY_LEVELS[key], boards, seed, timeout)
+            continue
+        results["presets"][key] = benchmark_preset(
+            generator, DIFFICULTY_LEVELS[key], seeds, 3 if timeout is None else timeout,
+            method)
+    return results
+
+
+def format_results(results):
+    lines = [f"{'preset':<10} {'solvable':>8} {'timeout':>8} {'p50':>7} "
+             f"{'p95':>7} {'p99':>7} {'nodes/s':>9}"]
+    for key, r in results["presets"].items():
+        lines.append(f"{key:<10} {r['solvable_rate']:>8.0%} {r['timeout_rate']:>8.0%} "
+                     f"{r['latency_p50']:>6.2f}s {r['latency_p95']:>6.2f}s "
+                     f"{r['latency_p99']:>6.2f}s {r['nodes_per_sec']:>9.0f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Board generation benchmark")
+    parser.add_argument("--presets", nargs="+", choices=list(DIFFICULTY_LEVELS),
+                        help="difficulty presets to run (default: all)")
+    parser.add_argument("--boards", type=int, default=20, help="boards per preset")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--timeout", type=float,
+                        help="stream: solver seconds per candidate, overriding the tuned "
+                             "candidate_timeout in assets/board_params.json; "
+                             "search/reverse: seconds per board (default: 3)")
+    parser.add_argument("--method", choices=["search", "reverse", "stream"], default="search")
+    parser.add_argument("--out", default="board_benchmark.json", help="JSON output file")
+
+    args = parser.parse_args(argv)
+    results = run_benchmark(args.presets, boards=args.boards, seed=args.seed,
+                            timeout=args.timeout, method=args.method)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(format_results(results))
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
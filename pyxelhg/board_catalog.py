@@ -0,0 +1,319 @@
+import argparse
+import bisect
+import glob
+import os
+import sys
+import time
+
+from board_generator import BoardGenerator
+from board_library import (BoardLibrary, BoardLibraryWriter, RECORD_CONSTRUCTED,
+                           RECORD_VERIFIED)
+from difficulty import DIFFICULTY_LEVELS
+
+# --------------------------------------------------
+#  盤面カタログの一括生成
+#  難易度 (または RxCxK) ごとに、解けると確認できた盤面を全コアで大量に作り、
+#  shard_size 件ずつの .hgbl ファイル (シャード) に書き出す。
+#    out/RxCxK/RxCxK-0000.hgbl, RxCxK-0001.hgbl, ...
+#  盤面ごとの seed は seed + 番号。中断しても、書き出し済みのシャードから
+#  済んだ seed を読み取って続きから再開する
+#  ゲームは assets/board_library/RxCxK.hgbl がなければ、assets/board_catalog の
+#  シャードを BoardCatalog でまとめて読む (main.py の load_board_library)
+# --------------------------------------------------
+
+
+def parse_preset(name):
+    """
+    難易度名 ("hard") か "RxCxK" ("9x12x5") を (rows, cols, colors) にする。
+    """
+    settings = DIFFICULTY_LEVELS.get(name)
+    if settings is not None:
+        return settings["grid_rows"], settings["grid_cols"], settings["colors"]
+    try:
+        rows, cols, colors = (int(v) for v in name.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Unknown preset {name!r} "
+                         f"(use one of {', '.join(DIFFICULTY_LEVELS)} or RxCxK)")
+    return rows, cols, colors
+
+
+def shard_path(directory, rows, cols, colors, index):
+    return os.path.join(directory, f"{rows}x{cols}x{colors}-{index:04d}.hgbl")
+
+
+def shard_paths(directory, rows, cols, colors):
+    """
+    directory にある (rows, cols, colors) のシャードを番号順に返す。
+    """
+    return sorted(glob.glob(os.path.join(directory, f"{rows}x{cols}x{colors}-*.hgbl")))
+
+
+class BoardCatalog:
+    """
+    シャードに分かれたカタログを、1つの BoardLibrary のように読む。
+    index は最初のシャードから通しで数える。
+    """
+
+    def __init__(self, paths):
+        self.libraries = []
+        self.offsets = []  # 各シャードの最初の index
+        self.count = 0
+        try:
+            for path in paths:
+                library = BoardLibrary(path)
+                self.libraries.append(library)
+                self.offsets.append(self.count)
+                self.count += len(library)
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for library in self.libraries:
+            library.close()
+
+    def _locate(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        shard = bisect.bisect_right(self.offsets, index) - 1
+        return self.libraries[shard], index - self.offsets[shard]
+
+    def board(self, index):
+        library, local = self._locate(index)
+        return library.board(local)
+
+    def solution(self, index):
+        library, local = self._locate(index)
+        return library.solution(local)
+
+    def metadata(self, index):
+        library, local = self._locate(index)
+        return library.metadata(local)
+
+    def board_for_seed(self, seed):
+        """
+        seed から決まる1枚を返す。同じ seed (と同じシャード) なら同じ盤面になる。
+        """
+        if not self.count:
+            return None
+        return self.board(seed % self.count)
+
+
+class ShardedWriter:
+    """
+    shard_size 件ごとにファイルを分けて盤面を書き出す。
+    既存のシャードがあれば読み取って、済んだ seed と件数を引き継ぐ
+    (書きかけのシャードにはそのまま追記する)。
+    """
+
+    def __init__(self, directory, rows, cols, colors, shard_size=10000):
+        self.directory = directory
+        self.rows = rows
+        self.cols = cols
+        self.colors = colors
+        self.shard_size = shard_size
+        self.done_seeds = set()
+        self.count = 0
+        self.writer = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.shards = shard_paths(directory, rows, cols, colors)
+        for path in self.shards:
+            with BoardLibrary(path) as library:
+                for i in range(len(library)):
+                    self.done_seeds.add(library.metadata(i)["seed"])
+                self.count += len(library)
+
+    def _open(self):
+        # 最後のシャードに空きがあればそこへ、なければ新しいシャードへ書く
+        if self.shards:
+            path = self.shards[-1]
+            writer = BoardLibraryWriter(path, self.rows, self.cols, self.colors)
+            if writer.count < self.shard_size:
+                return writer
+            writer.close()
+        path = shard_path(self.directory, self.rows, self.cols, self.colors,
+                          len(self.shards))
+        self.shards.append(path)
+        return BoardLibraryWriter(path, self.rows, self.cols, self.colors)
+
+    def append(self, board, solution, seed, flags):
+        if self.writer is None:
+            self.writer = self._open()
+        self.writer.append(board, solution, seed=seed, flags=flags)
+        self.done_seeds.add(seed)
+        self.count += 1
+        if self.writer.count >= self.shard_size:
+            self.writer.close()
+            self.writer = None
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --------------------------------------------------
+#  ワーカープロセス側
+# --------------------------------------------------
+
+_catalog_generator = None
+
+
+def _init_catalog_worker(quiet):
+    # プロセスごとに1つの BoardGenerator を使い回す (置換表も引き継がれる)
+    global _catalog_generator
+    _catalog_generator = BoardGenerator()
+    if quiet:
+        # 盤面ごとの Debug 行は数が多すぎるので、ワーカーでは捨てる
+        sys.stdout = open(os.devnull, "w")
+
+
+def _catalog_worker(task):
+    """
+    seed から盤面を1枚作る。(seed, 盤面, 解, レコードのフラグ) を返し、
+    解けると確認できなければ盤面は None。
+    """
+    rows, cols, colors, method, timeout, seed = task
+    generator = _catalog_generator
+    board = generator.generate_filled_solvable_board(
+        rows, cols, colors, timeout=timeout, method=method, seed=seed)
+    if not generator.last_board_verified:
+        return seed, None, None, 0
+    solution = generator.last_solution
+    flags = RECORD_CONSTRUCTED if solution else RECORD_VERIFIED
+    return seed, board, solution, flags
+
+
+def _pending_seeds(seed, done_seeds, limit):
+    """
+    seed, seed + 1, ... のうち、まだ書き出していないものを limit 個返す。
+    """
+    pending = []
+    board_seed = seed
+    while len(pending) < limit:
+        if board_seed not in done_seeds:
+            pending.append(board_seed)
+        board_seed += 1
+    return pending
+
+
+def build_catalog(directory, rows, cols, colors, count, method="reverse", timeout=3,
+                  seed=0, workers=None, shard_size=10000, report_interval=5.0,
+                  quiet=True):
+    """
+    (rows, cols, colors) の解ける盤面が count 件になるまで directory のシャードに書き足す。
+    workers 個 (省略時は CPU 数) のプロセスで生成し、report_interval 秒ごとに
+    進み具合と速さを表示する。書き出した件数を返す。
+    """
+    # Web 版 (pyxel app2html) ではプロセスを使えないので、必要なときだけ読み込む
+    import multiprocessing
+
+    workers = workers or os.cpu_count() or 1
+    name = f"{rows}x{cols}x{colors}"
+    with ShardedWriter(directory, rows, cols, colors, shard_size) as writer:
+        if writer.count >= count:
+            print(f"{name}: already {writer.count}/{count} boards")
+            return 0
+        if writer.count:
+            print(f"{name}: resuming at {writer.count}/{count} boards")
+
+        started = time.perf_counter()
+        last_report = started
+        written = 0
+        failed = 0
+        next_seed = seed
+        pool = multiprocessing.Pool(workers, initializer=_init_catalog_worker,
+                                    initargs=(quiet,))
+        try:
+            while writer.count < count:
+                # imap は渡した分をすぐ全部キューに積むので、少しずつ渡す
+                seeds = _pending_seeds(next_seed, writer.done_seeds, workers * 16)
+                next_seed = seeds[-1] + 1
+                tasks = [(rows, cols, colors, method, timeout, s) for s in seeds]
+                for board_seed, board, solution, flags in pool.imap_unordered(
+                        _catalog_worker, tasks, chunksize=4):
+                    if board is None:
+                        failed += 1
+                    else:
+                        writer.append(board, solution, board_seed, flags)
+                        written += 1
+                        if writer.count >= count:
+                            break  # 残りのワーカーは terminate で止める
+
+                    now = time.perf_counter()
+                    if now - last_report >= report_interval:
+                        last_report = now
+                        writer.flush()  # 中断してもここまでは再開で読める
+                        _report(name, writer.count, count, written, failed,
+                                now - started)
+        finally:
+            pool.terminate()
+            pool.join()
+        _report(name, writer.count, count, written, failed,
+                time.perf_counter() - started)
+    return written
+
+
+def _report(name, total, count, written, failed, elapsed):
+    rate = written / elapsed if elapsed else 0.0
+    eta = (count - total) / rate if rate else float("inf")
+    print(f"{name}: {total}/{count} boards, {rate:.1f} boards/s, "
+          f"{failed} failed, {elapsed:.0f}s elapsed, ETA {eta:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mass-produce verified boards into sharded board libraries")
+    parser.add_argument("presets", nargs="+",
+                        help=f"difficulty names ({', '.join(DIFFICULTY_LEVELS)}) or RxCxK")
+    parser.add_argument("--count", type=int, default=100000,
+                        help="boards per preset (existing shards count towards it)")
+    parser.add_argument("--method", choices=["reverse", "search"], default="reverse")
+    parser.add_argument("--timeout", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=10000)
+    parser.add_argument("--report", type=float, default=5.0,
+                        help="seconds between progress lines")
+    parser.add_argument("--verbose", action="store_true",
+                        help="keep the per-board debug output of the workers")
+    parser.add_argument("--out", help="output directory (default: assets/board_catalog)")
+
+    args = parser.parse_args(argv)
+    try:
+        presets = [parse_preset(name) for name in args.presets]
+    except ValueError as e:
+        parser.error(str(e))
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "assets", "board_catalog")
+    for rows, cols, colors in presets:
+        directory = os.path.join(out, f"{rows}x{cols}x{colors}")
+        build_catalog(directory, rows, cols, colors, args.count, method=args.method,
+                      timeout=args.timeout, seed=args.seed, workers=args.workers,
+                      shard_size=args.shard_size, report_interval=args.report,
+                      quiet=not args.verbose)
+        print(f"Wrote {directory}")
+
+
+if __name__ == "__main__":
+    main()
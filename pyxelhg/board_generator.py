@@ -1,79 +1,1635 @@
+import json
+import os
 import random
+from array import array
 from collections import deque
 import time
 
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python 3.9 以前
+    def _popcount(x):
+        return bin(x).count("1")
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x):
+    """
+    64bit 値をよく混ぜる (splitmix64 の仕上げ部分)。
+    色ごとのハッシュを足し合わせても、別の組み合わせと偶然一致しにくくする。
+    """
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+# board_tuner.py が書き出す、盤面の大きさごとの生成パラメータ
+BOARD_PARAMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "assets", "board_params.json")
+
+
+def params_key(rows, cols, colors):
+    return f"{rows}x{cols}x{colors}"
+
+
+def load_board_params(path=BOARD_PARAMS_PATH):
+    """
+    生成パラメータのファイルを読み、{"RxCxK": {パラメータ名: 値}} を返す。
+    ファイルがない・壊れているときは空の辞書 (従来の値を使う)。
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Debug: Could not load board params from {path}: {e}")
+        return {}
+    return data.get("presets", {})
+
+
+class BitBoard:
+    """
+    ソルバ用のビットボード盤面。
+    色ごとに1本の整数マスクを持ち、列ごとに下から上へビットを並べる。
+    列と列の間に番兵ビットを1つ挟むので、シフトしても隣の列へ漏れない。
+    セル (r, c) は c * stride + (rows - 1 - r) 番目のビット。
+    インスタンスは不変として扱い、remove() は新しい盤面を返す。
+    zobrist には盤面の Zobrist ハッシュを持ち、remove() で差分更新する。
+    塊の一覧も、親の一覧のうち変化した範囲に触れない塊はそのまま引き継ぐ。
+
+    canonical=True なら、色の番号を入れ替えただけの盤面が同じハッシュになる
+    (解けるかどうかは色の付け替えで変わらないので、置換表で結果を共有できる)。
+    色ごとに位置だけの Zobrist ハッシュ color_hashes を持ち、
+    それぞれを混ぜてから足し合わせた値を zobrist にする。
+    """
+    __slots__ = ("rows", "cols", "stride", "full", "bottom", "zkeys",
+                 "masks", "zobrist", "color_hashes",
+                 "_groups", "_parent_groups", "_removed")
+
+    def __init__(self, rows, cols, masks, canonical=False):
+        self.rows = rows
+        self.cols = cols
+        self.stride = rows + 1
+        self.full, self.bottom = self._geometry(rows, cols)
+        self.zkeys = self._zobrist_keys(rows, cols, len(masks))
+        self.masks = masks
+        self._groups = None
+        self._parent_groups = None
+        self._removed = None
+        self.zobrist = 0
+        self.color_hashes = None
+        if canonical:
+            # 位置の乱数表は色 0 のものを全色で使う
+            self.color_hashes = tuple(self._hash_bits(self.zkeys[0], mask)
+                                      for mask in masks)
+            for h in self.color_hashes:
+                if h:
+                    self.zobrist = (self.zobrist + _mix64(h)) & _MASK64
+            return
+        for color, mask in enumerate(masks):
+            self.zobrist ^= self._hash_bits(self.zkeys[color], mask)
+
+    _geometry_cache = {}
+    _zobrist_cache = {}
+
+    @classmethod
+    def _geometry(cls, rows, cols):
+        """
+        盤面全体のマスクと最下段のマスクを (rows, cols) ごとにキャッシュして返す。
+        """
+        key = (rows, cols)
+        geometry = cls._geometry_cache.get(key)
+        if geometry is None:
+            stride = rows + 1
+            column = (1 << rows) - 1
+            full = 0
+            bottom = 0
+            for c in range(cols):
+                full |= column << (c * stride)
+                bottom |= 1 << (c * stride)
+            geometry = (full, bottom)
+            cls._geometry_cache[key] = geometry
+        return geometry
+
+    @classmethod
+    def _zobrist_keys(cls, rows, cols, colors):
+        """
+        (色, ビット位置) ごとの 64bit 乱数表を返す。
+        グローバルな random の状態を変えないよう、専用の乱数で作る。
+        """
+        key = (rows, cols)
+        keys = cls._zobrist_cache.setdefault(key, [])
+        if len(keys) < max(colors, 1):
+            rng = random.Random(f"zobrist-{rows}x{cols}-{len(keys)}")
+            size = cols * (rows + 1)
+            for _ in range(len(keys), colors):
+                keys.append([rng.getrandbits(64) for _ in range(size)])
+        return keys
+
+    @staticmethod
+    def _hash_bits(keys, bits):
+        h = 0
+        while bits:
+            bit = bits & -bits
+            h ^= keys[bit.bit_length() - 1]
+            bits ^= bit
+        return h
+
+    @classmethod
+    def from_board(cls, board, empty=-1, canonical=False):
+        """
+        色番号の2次元リストからビットボードを作る。
+        """
+        rows = len(board)
+        cols = len(board[0])
+        stride = rows + 1
+        colors = max((cell for row in board for cell in row), default=empty) + 1
+        masks = [0] * max(colors, 0)
+        for r in range(rows):
+            for c in range(cols):
+                color = board[r][c]
+                if color != empty:
+                    masks[color] |= 1 << (c * stride + rows - 1 - r)
+        return cls(rows, cols, tuple(masks), canonical)
+
+    def to_board(self, empty=-1):
+        """
+        色番号の2次元リストに戻す。
+        """
+        board = [[empty] * self.cols for _ in range(self.rows)]
+        for color, mask in enumerate(self.masks):
+            while mask:
+                bit = mask & -mask
+                pos = bit.bit_length() - 1
+                c, y = divmod(pos, self.stride)
+                board[self.rows - 1 - y][c] = color
+                mask ^= bit
+        return board
+
+    def cell(self, r, c):
+        """
+        盤面座標 (r, c) のビットを返す。
+        """
+        return 1 << (c * self.stride + self.rows - 1 - r)
+
+    def occupied(self):
+        occ = 0
+        for mask in self.masks:
+            occ |= mask
+        return occ
+
+    def is_empty(self):
+        return not any(self.masks)
+
+    def color_counts(self):
+        return [_popcount(mask) for mask in self.masks]
+
+    def key(self):
+        return self.masks
+
+    def flood(self, seed, mask):
+        """
+        seed から mask 内で上下左右につながるセルをまとめて返す。
+        """
+        stride = self.stride
+        group = seed
+        while True:
+            grown = (group | (group << 1) | (group >> 1)
+                     | (group << stride) | (group >> stride)) & mask
+            if grown == group:
+                return group
+            group = grown
+
+    def groups(self):
+        """
+        2つ以上の同色連結塊を (色, マスク) の一覧で返す。
+        一度求めた一覧は覚えておく (呼び出し側で書き換えないこと)。
+        """
+        if self._groups is None:
+            if self._parent_groups is not None:
+                self._groups = self._update_groups(self._parent_groups, self._removed)
+                self._parent_groups = None
+            else:
+                self._groups = self._find_groups(-1)
+        return self._groups
+
+    def _update_groups(self, parent_groups, removed):
+        """
+        親の塊の一覧から差分で求める。removed は (消した塊, 列詰めでずれた範囲)。
+        変化しうるセル (消した塊の列の、消したセルの最下段から上と、ずれた範囲) と
+        その上下左右に触れない塊は、セルも隣も変わっていないのでそのまま残し、
+        それ以外は変化した範囲の周りだけ塗り直す。
+        """
+        stride = self.stride
+        group, dirty = removed
+        column = (1 << self.rows) - 1
+        while group:
+            low = group & -group
+            column_bits = column << ((low.bit_length() - 1) // stride * stride)
+            dirty |= column_bits & ~(low - 1)
+            group &= ~column_bits
+        touched = (dirty | (dirty << 1) | (dirty >> 1)
+                   | (dirty << stride) | (dirty >> stride)) & self.full
+        groups = [g for g in parent_groups if not g[1] & touched]
+        groups.extend(self._find_groups(touched))
+        # 全体を調べ直したときと同じ順 (色、盤面の走査順) にそろえる
+        groups.sort(key=lambda g: (g[0], g[1] & -g[1]))
+        return groups
+
+    def _find_groups(self, region):
+        """
+        region に1セルでもかかる塊を探す (region = -1 なら盤面全体)。
+        """
+        stride = self.stride
+        groups = []
+        for color, mask in enumerate(self.masks):
+            remaining = mask & region
+            while remaining:
+                seed = remaining & -remaining
+                # 孤立セルは塗り広げずに飛ばす
+                if not ((seed << 1) | (seed >> 1)
+                        | (seed << stride) | (seed >> stride)) & mask:
+                    remaining ^= seed
+                    continue
+                group = self.flood(seed, mask)
+                remaining &= ~group
+                groups.append((color, group))
+        return groups
+
+    def lowest_row(self, group):
+        """
+        group の最も下にあるセルの高さ (最下段が 0) を返す。
+        """
+        stride = self.stride
+        column = (1 << self.rows) - 1
+        rows = 0
+        while group:
+            rows |= group & column
+            group >>= stride
+        return (rows & -rows).bit_length() - 1
+
+    def group_at(self, r, c):
+        """
+        (r, c) を含む同色連結塊を (色, マスク) で返す。空セルなら None。
+        """
+        bit = self.cell(r, c)
+        for color, mask in enumerate(self.masks):
+            if mask & bit:
+                return color, self.flood(bit, mask)
+        return None
+
+    def remove(self, color, group):
+        """
+        group を消して重力と列詰めを適用した新しい盤面を返す。
+        すべてビット演算で処理する。
+        """
+        masks = list(self.masks)
+        masks[color] &= ~group
+        full = self.full
+        stride = self.stride
+
+        column = (1 << self.rows) - 1
+
+        # 重力: 消したセルを上から順に縦の連続ごとに抜き、
+        #       その上の同じ列のセルを抜いた段数だけ下げる
+        remaining = group
+        while remaining:
+            top = remaining.bit_length() - 1
+            length = 1
+            while (top - length + 1) % stride and remaining >> (top - length) & 1:
+                length += 1
+            bottom = top - length + 1
+            run = ((1 << length) - 1) << bottom
+            remaining ^= run
+            above = (column << (bottom // stride * stride)) & ~((1 << (top + 1)) - 1)
+            keep = ~(above | run)
+            for i, mask in enumerate(masks):
+                upper = mask & above
+                if upper:
+                    masks[i] = (mask & keep) | (upper >> length)
+        occ = 0
+        for mask in masks:
+            occ |= mask
+
+        # 列詰め: 最下段が空の列を右から順に詰める
+        shifted = 0
+        empty_columns = self.bottom & ~occ
+        while empty_columns:
+            top = empty_columns.bit_length() - 1
+            empty_columns ^= 1 << top
+            if not occ >> top:
+                continue
+            low = (1 << top) - 1
+            high = ~low
+            for i, mask in enumerate(masks):
+                masks[i] = (mask & low) | ((mask >> stride) & high)
+            occ = (occ & low) | ((occ >> stride) & high)
+            # 詰めた列から右はすべて位置が変わる
+            shifted = full & high
+
+        # Zobrist ハッシュは変化したセルの分だけ更新する
+        zobrist = self.zobrist
+        color_hashes = self.color_hashes
+        if color_hashes is None:
+            for i, mask in enumerate(masks):
+                changed = self.masks[i] ^ mask
+                if changed:
+                    zobrist ^= self._hash_bits(self.zkeys[i], changed)
+        else:
+            # 色の番号によらないハッシュ: 変化した色だけ、混ぜた値を引いて新しい値を足す
+            color_hashes = list(color_hashes)
+            keys = self.zkeys[0]
+            for i, mask in enumerate(masks):
+                changed = self.masks[i] ^ mask
+                if changed:
+                    old = color_hashes[i]
+                    new = old ^ self._hash_bits(keys, changed)
+                    color_hashes[i] = new
+                    if old:
+                        zobrist -= _mix64(old)
+                    if new:
+                        zobrist += _mix64(new)
+            color_hashes = tuple(color_hashes)
+            zobrist &= _MASK64
+
+        state = self._derive(tuple(masks), zobrist, color_hashes)
+        if self._groups is not None:
+            # 塊の一覧は必要になったときに差分で求める
+            state._parent_groups = self._groups
+            state._removed = (group, shifted)
+        return state
+
+    def _derive(self, masks, zobrist, color_hashes=None):
+        """
+        形状が同じ盤面を、ジオメトリの再計算なしで作る。
+        """
+        state = BitBoard.__new__(BitBoard)
+        state.rows = self.rows
+        state.cols = self.cols
+        state.stride = self.stride
+        state.full = self.full
+        state.bottom = self.bottom
+        state.zkeys = self.zkeys
+        state.masks = masks
+        state.zobrist = zobrist
+        state.color_hashes = color_hashes
+        state._groups = None
+        state._parent_groups = None
+        state._removed = None
+        return state
+
+
+class ColumnState:
+    """
+    列ごとのタプルで持つ不変の盤面 (ソルバ用のもう1つの表現)。
+    columns は左から順の列で、各列は下から上への色番号のタプル。空になった列は持たない。
+    重力は列の中の絞り込み、列詰めは空の列を落とすだけで済み、
+    remove() で変わらなかった列のタプルは新しい盤面でもそのまま共有する。
+    塊は BitBoard と同じビット配置 (c * stride + 下からの高さ) のマスクで表すので、
+    手の並べ方や枝刈りは BitBoard と同じものが使える。
+    """
+    __slots__ = ("rows", "cols", "stride", "colors", "columns", "zobrist",
+                 "_groups", "_masks")
+
+    def __init__(self, rows, cols, colors, columns):
+        self.rows = rows
+        self.cols = cols
+        self.stride = rows + 1
+        self.colors = colors
+        self.columns = columns
+        # 置換表のキー。列のタプルはそのままハッシュできる
+        self.zobrist = hash(columns) & _MASK64
+        self._groups = None
+        self._masks = None
+
+    @classmethod
+    def from_board(cls, board, empty=-1, canonical=False):
+        """
+        色番号の2次元リストから作る。重力と列詰めが済んでいない盤面でもよい。
+        """
+        if canonical:
+            raise ValueError("ColumnState does not support canonical hashing")
+        rows = len(board)
+        cols = len(board[0])
+        colors = max((cell for row in board for cell in row), default=empty) + 1
+        columns = []
+        for c in range(cols):
+            column = tuple(board[r][c] for r in range(rows - 1, -1, -1)
+                           if board[r][c] != empty)
+            if column:
+                columns.append(column)
+        return cls(rows, cols, max(colors, 0), tuple(columns))
+
+    def to_board(self, empty=-1):
+        board = [[empty] * self.cols for _ in range(self.rows)]
+        for c, column in enumerate(self.columns):
+            for y, color in enumerate(column):
+                board[self.rows - 1 - y][c] = color
+        return board
+
+    def is_empty(self):
+        return not self.columns
+
+    def color_counts(self):
+        counts = [0] * self.colors
+        for column in self.columns:
+            for color in column:
+                counts[color] += 1
+        return counts
+
+    def key(self):
+        return self.columns
+
+    @property
+    def masks(self):
+        """
+        色ごとのマスク (BitBoard.masks と同じ形)。枝刈りルールのために必要なときだけ作る。
+        """
+        if self._masks is None:
+            masks = [0] * self.colors
+            stride = self.stride
+            for c, column in enumerate(self.columns):
+                base = c * stride
+                for y, color in enumerate(column):
+                    masks[color] |= 1 << (base + y)
+            self._masks = tuple(masks)
+        return self._masks
+
+    def groups(self):
+        """
+        2つ以上の同色連結塊を (色, マスク) の一覧で返す。
+        並び順は BitBoard.groups() と同じ (色、盤面の走査順)。
+        """
+        if self._groups is None:
+            stride = self.stride
+            columns = self.columns
+            width = len(columns)
+            seen = set()
+            groups = []
+            for c, column in enumerate(columns):
+                for y, color in enumerate(column):
+                    if (c, y) in seen:
+                        continue
+                    seen.add((c, y))
+                    stack = [(c, y)]
+                    group = 0
+                    size = 0
+                    while stack:
+                        cc, yy = stack.pop()
+                        group |= 1 << (cc * stride + yy)
+                        size += 1
+                        for nc, ny in ((cc - 1, yy), (cc + 1, yy), (cc, yy - 1), (cc, yy + 1)):
+                            if (0 <= nc < width and 0 <= ny < len(columns[nc])
+                                    and columns[nc][ny] == color and (nc, ny) not in seen):
+                                seen.add((nc, ny))
+                                stack.append((nc, ny))
+                    if size >= 2:
+                        groups.append((color, group))
+            groups.sort(key=lambda g: (g[0], g[1] & -g[1]))
+            self._groups = groups
+        return self._groups
+
+    # ビット配置が同じなので BitBoard の実装をそのまま使う
+    lowest_row = BitBoard.lowest_row
+
+    def remove(self, color, group):
+        """
+        group を消して重力と列詰めを適用した新しい盤面を返す。
+        触れなかった列はタプルを共有する。
+        """
+        stride = self.stride
+        column_mask = (1 << self.rows) - 1
+        columns = list(self.columns)
+        while group:
+            c = ((group & -group).bit_length() - 1) // stride
+            bits = (group >> (c * stride)) & column_mask
+            group &= ~(column_mask << (c * stride))
+            columns[c] = tuple(v for y, v in enumerate(columns[c]) if not bits >> y & 1)
+        return ColumnState(self.rows, self.cols, self.colors,
+                           tuple(column for column in columns if column))
+
+
+# ソルバで使える盤面の表現
+STATE_TYPES = {
+    "bitboard": BitBoard,
+    "columns": ColumnState,
+}
+
+
+class TranspositionTable:
+    """
+    Zobrist ハッシュをキーにした固定サイズの置換表。
+    2スロットのバケットに (キー, 値, 深さ, 世代) を持ち、
+    空きがなければ「古い世代」→「深さ (残りセル数) が小さい」順に置き換える。
+    メモリは size に比例して一定なので、大きい盤面でも増え続けない。
+    """
+
+    def __init__(self, size=1 << 18):
+        # 2のべき乗に切り上げる (添字をビットマスクで求めるため)
+        size = 1 << max(1, (size - 1).bit_length())
+        self.size = size
+        self.mask = size - 1
+        self.keys = array("Q", bytes(8 * size))
+        self.values = bytearray(size)
+        self.depths = bytearray(size)
+        self.ages = bytearray(size)
+        self.generation = 1
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """
+        新しい盤面の探索を始める。既存の項目は残すが置き換えやすくなる。
+        """
+        self.generation = self.generation % 255 + 1
+
+    def clear(self):
+        """
+        すべての項目を消す。
+        """
+        self.keys = array("Q", bytes(8 * self.size))
+        self.values = bytearray(self.size)
+        self.depths = bytearray(self.size)
+        self.ages = bytearray(self.size)
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def probe(self, key):
+        """
+        key の値を返す。なければ None。
+        """
+        key = key or 1  # 0 は空きスロットの印なので使わない
+        self.probes += 1
+        index = key & self.mask
+        keys = self.keys
+        if keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        index ^= 1
+        if keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        return None
+
+    def store(self, key, value, depth):
+        key = key or 1
+        depth = min(depth, 255)
+        first = key & self.mask
+        second = first ^ 1
+        keys = self.keys
+        if keys[first] == key or not keys[first]:
+            index = first
+        elif keys[second] == key or not keys[second]:
+            index = second
+        else:
+            index = min((first, second), key=self._priority)
+            self.replacements += 1
+        keys[index] = key
+        self.values[index] = value
+        self.depths[index] = depth
+        self.ages[index] = self.generation
+        self.stores += 1
+
+    def _priority(self, index):
+        """
+        置き換え候補の優先度。今の世代の項目ほど、深い項目ほど残す。
+        """
+        return (self.ages[index] == self.generation, self.depths[index])
+
+
+# --------------------------------------------------
+#  ソルバの手の並べ方 (move ordering)
+#  どれも (盤面, 塊の一覧) を受け取り、試す順に並べた一覧を返す
+# --------------------------------------------------
+
+def _order_raster(state, groups):
+    """見つかった順 (色ごと・盤面の走査順) のまま。"""
+    return groups
+
+
+def _order_rarest_color(state, groups):
+    """残りセル数が少ない色から消す。取り残されやすい色を先に片付ける。"""
+    counts = state.color_counts()
+    return sorted(groups, key=lambda g: (counts[g[0]], -_popcount(g[1])))
+
+
+def _order_largest_group(state, groups):
+    """大きい塊から消す。"""
+    return sorted(groups, key=lambda g: -_popcount(g[1]))
+
+
+def _order_lowest_row(state, groups):
+    """下の段にある塊から消す。上の塊が落ちてきて新しくつながりやすい。"""
+    return sorted(groups, key=lambda g: state.lowest_row(g[1]))
+
+
+MOVE_ORDERINGS = {
+    "raster": _order_raster,
+    "rarest_color": _order_rarest_color,
+    "largest_group": _order_largest_group,
+    "lowest_row": _order_lowest_row,
+}
+
+
+# --------------------------------------------------
+#  枝刈りルール (解けるための必要条件)
+#  どれも盤面を受け取り、「絶対に解けない」と分かれば True を返す。
+#  根と探索中のすべての局面で O(セル数) 以内で判定する
+# --------------------------------------------------
+
+def _prune_singleton_color(state):
+    """残りがちょうど1セルの色があれば、その色は二度と消せない。"""
+    for mask in state.masks:
+        if mask and not mask & (mask - 1):
+            return True
+    return False
+
+
+PRUNING_RULES = {
+    "singleton_color": _prune_singleton_color,
+}
+
+
+# --------------------------------------------------
+#  手の独立性 (半順序簡約 / スリープ集合)
+#  塊を消して変化するのは、その塊の列の消したセルより上と、列が丸ごと空になったときの
+#  右側の列だけ。2つの塊の影響範囲と隣接セルが重ならなければ、どちらを先に消しても
+#  同じ局面になる。ソルバはこういう2手を片方の順でしか試さない
+# --------------------------------------------------
+
+def _move_span(state, group):
+    """
+    塊を消したときに影響しうる列の範囲 (lo, hi, compresses) を返す。
+    compresses は列が丸ごと空になって、右の列がずれるかどうか。
+    """
+    stride = state.stride
+    lo = ((group & -group).bit_length() - 1) // stride
+    hi = (group.bit_length() - 1) // stride
+    column = (1 << state.rows) - 1
+    occupied = None
+    for c in range(lo, hi + 1):
+        if not group >> (c * stride) & 1:
+            continue  # 最下段を消さない列は空にならない
+        if occupied is None:
+            occupied = 0
+            for mask in state.masks:
+                occupied |= mask
+        if not occupied & ~group & (column << (c * stride)):
+            return lo, hi, True
+    return lo, hi, False
+
+
+def _spans_independent(a, b):
+    """
+    _move_span の結果どうしで、2手が順番を入れ替えても同じ局面になるか。
+    間に1列以上あいていて、左の手が列を詰めなければ独立 (安全側の判定)。
+    """
+    if a[1] + 1 < b[0]:
+        return not a[2]
+    if b[1] + 1 < a[0]:
+        return not b[2]
+    return False
+
+
+# --------------------------------------------------
+#  解けなかった候補の修繕 (repair)
+#  どれも (盤面, 乱数, 空セルの値) を受け取り、盤面を1か所だけ書き換える。
+#  書き換えられれば True、当てはまる場所がなければ False を返す
+# --------------------------------------------------
+
+_NEIGHBORS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def _neighbor_cells(board, r, c, empty):
+    rows = len(board)
+    cols = len(board[0])
+    return [(r + dr, c + dc) for dr, dc in _NEIGHBORS
+            if 0 <= r + dr < rows and 0 <= c + dc < cols
+            and board[r + dr][c + dc] != empty]
+
+
+def _singleton_cells(board, empty):
+    """同じ色の隣がない (どの塊にも入っていない) セルの一覧。"""
+    return [(r, c) for r, row in enumerate(board) for c, color in enumerate(row)
+            if color != empty and all(board[nr][nc] != color
+                                      for nr, nc in _neighbor_cells(board, r, c, empty))]
+
+
+def _color_counts(board, empty):
+    counts = {}
+    for row in board:
+        for color in row:
+            if color != empty:
+                counts[color] = counts.get(color, 0) + 1
+    return counts
+
+
+# 修繕ではどの色も盤面から消さない (色数が colors より少ない盤面にしない) ように、
+# その色の最後の1セルは塗り替えない
+
+def _repair_merge_singletons(board, rng, empty):
+    """隣り合う孤立セルの片方をもう片方の色に塗り、2セルの塊にする。"""
+    singletons = _singleton_cells(board, empty)
+    lookup = set(singletons)
+    counts = _color_counts(board, empty)
+    pairs = [(cell, other) for cell in singletons
+             for other in _neighbor_cells(board, cell[0], cell[1], empty)
+             if other in lookup and counts[board[other[0]][other[1]]] > 1]
+    if not pairs:
+        return False
+    (r, c), (nr, nc) = rng.choice(pairs)
+    board[nr][nc] = board[r][c]
+    return True
+
+
+def _repair_recolor_stranded(board, rng, empty):
+    """孤立セルを隣のセルの色に塗り、その塊につなげる。"""
+    counts = _color_counts(board, empty)
+    singletons = [(r, c) for r, c in _singleton_cells(board, empty)
+                  if counts[board[r][c]] > 1]
+    if not singletons:
+        return False
+    r, c = rng.choice(singletons)
+    neighbors = _neighbor_cells(board, r, c, empty)
+    if not neighbors:
+        return False
+    nr, nc = rng.choice(neighbors)
+    board[r][c] = board[nr][nc]
+    return True
+
+
+# 前にあるものから順に、当てはまる最初の修繕を使う
+REPAIR_MUTATIONS = {
+    "merge_singletons": _repair_merge_singletons,
+    "recolor_stranded": _repair_recolor_stranded,
+}
+
+# 修繕1回で書き換えるセルの数
+REPAIR_CELLS = 4
+
+
+# --------------------------------------------------
+#  パースコア探索の「残り盤面の見込み点」
+#  どれも (盤面, score_multiplier) を受け取り、この先取れそうな点を返す
+# --------------------------------------------------
+
+def _potential_colors(state, multiplier):
+    """
+    色ごとに残りをほぼひと塊 (n - 2 個) で消せたときの点の合計。
+    塊を探さずに数えられるので軽い。大きい色を崩さずに残す局面ほど高い。
+    """
+    return sum(int(max(count - 2, 0) ** 3 * multiplier)
+               for count in state.color_counts())
+
+
+def _potential_groups(state, multiplier):
+    """今ある塊をそれぞれ1手で消したときの点の合計。小さめの盤面で強い。"""
+    return sum(int(_popcount(group) ** 3 * multiplier) for _, group in state.groups())
+
+
+PAR_POTENTIALS = (_potential_colors, _potential_groups)
+
+# パースコア探索が処理を譲るまでに見込み点を求める局面数
+PAR_STEP_STATES = 8
+
+
+# ソルバが処理を譲るまでに展開する局面数 (おおよそ 1ms 程度)
+# 締め切り (Deadline) もこの間隔でしか確かめない
+SOLVER_STEP_NODES = 64
+
+# ソルバの結果
+SOLVABLE = "solvable"  # 解けた
+UNSOLVABLE = "unsolvable"  # 解けないと証明できた
+UNKNOWN = "unknown"  # 時間切れでどちらか分からない
+
+# recheck_unknown_board で判定し直しても時間切れの盤面は、この回数で諦めて捨てる
+UNKNOWN_RECHECKS = 3
+
+
+class Deadline:
+    """
+    処理の締め切り。seconds が None なら締め切りなし。
+    clock (既定は time.perf_counter) の時刻で数える。StepClock を渡すと、
+    ResumableTask.step() の中で使った時間だけで数える。
+    呼び出しごとに作るので、前の呼び出しの時間切れを引きずらない。
+    """
+    __slots__ = ("at", "clock")
+
+    def __init__(self, seconds=None, clock=time.perf_counter):
+        self.clock = clock
+        self.at = None if seconds is None else clock() + seconds
+
+    def expired(self):
+        return self.at is not None and self.clock() >= self.at
+
+    def remaining(self):
+        """残り秒数 (締め切りなしなら None)。"""
+        if self.at is None:
+            return None
+        return max(0.0, self.at - self.clock())
+
+
+class StepClock:
+    """
+    start() から stop() までの間だけ進む時計。呼ぶと今までに進んだ秒数を返す。
+    少しずつ進める処理の締め切りを、処理を譲っている間 (フレームの残り、
+    一時停止中) を除いた時間で数えるために使う。
+    """
+    __slots__ = ("elapsed", "started")
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        if self.started is not None:
+            self.elapsed += time.perf_counter() - self.started
+            self.started = None
+
+    def __call__(self):
+        if self.started is None:
+            return self.elapsed
+        return self.elapsed + time.perf_counter() - self.started
+
+
+def _run_steps(steps):
+    """
+    中断できる処理 (ジェネレータ) を最後まで進めて、戻り値を返す。
+    """
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+class ResumableTask:
+    """
+    中断できる処理を、1回あたりの時間を区切って進めるためのラッパー。
+    step() が True を返したら終わりで、結果は result に入る。
+    clock (StepClock) を渡すと、step() の中にいる間だけその時計を進める。
+    """
+
+    def __init__(self, steps, clock=None):
+        self._steps = steps
+        self.clock = clock
+        self.done = False
+        self.result = None
+
+    def step(self, budget=0.008):
+        """
+        budget 秒ぶんだけ処理を進める。
+        """
+        deadline = time.perf_counter() + budget
+        if self.clock is not None:
+            self.clock.start()
+        try:
+            while not self.done:
+                try:
+                    next(self._steps)
+                except StopIteration as stop:
+                    self.done = True
+                    self.result = stop.value
+                    break
+                if time.perf_counter() >= deadline:
+                    break
+        finally:
+            if self.clock is not None:
+                self.clock.stop()
+        return self.done
+
+    def cancel(self):
+        self._steps.close()
+        self.done = True
+
+
+class FreeCells:
+    """
+    盤面の空きセルの集合。
+    一覧と「セル→一覧の位置」の表を持ち、ランダムな取り出しと削除を O(1) で行う
+    (削除は末尾の要素を空いた位置へ移す swap-remove)。
+    """
+    __slots__ = ("cols", "cells", "positions")
+
+    def __init__(self, rows, cols):
+        self.cols = cols
+        self.cells = list(range(rows * cols))
+        self.positions = list(range(rows * cols))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        r, c = cell
+        return self.positions[r * self.cols + c] >= 0
+
+    def choice(self, rng=random):
+        return divmod(rng.choice(self.cells), self.cols)
+
+    def discard(self, r, c):
+        index = r * self.cols + c
+        position = self.positions[index]
+        if position < 0:
+            return
+        last = self.cells.pop()
+        if last != index:
+            self.cells[position] = last
+            self.positions[last] = position
+        self.positions[index] = -1
+
+
+# --------------------------------------------------
+#  生成・探索の統計
+#  ログに残して「なぜ時間切れになったか」を後から調べられるよう、
+#  どれも to_dict() で JSON にできる形で返す
+# --------------------------------------------------
+
+class AttemptStats:
+    """
+    候補盤面1枚ぶん (ソルバ1回ぶん) の統計。
+    result は試行の終わり方:
+      "solved"      解けた
+      "unsolvable"  すべての手を試して解けなかった
+      "pruned"      探索前に枝刈りルールで落ちた
+      "timeout"     時間切れで打ち切った
+      "constructed" 逆再生で作れた (ソルバは使っていない)
+      "dead_end"    逆再生が行き詰まった
+    """
+
+    def __init__(self):
+        self.nodes = 0  # 展開した局面数
+        self.max_depth = 0  # 探索スタックの最大の深さ (手数)
+        self.tt_hits = 0  # 置換表で解けないと分かった回数
+        self.tt_misses = 0
+        self.prunes = {}  # 枝刈りルールごとの回数
+        self.seconds = 0.0  # 候補の生成と判定にかかった時間
+        self.solve_seconds = 0.0  # そのうちソルバにかかった時間
+        self.result = None
+        self.repair = 0  # 何回目の修繕か (0 は新しい候補)
+
+    def to_dict(self):
+        return {
+            "nodes": self.nodes,
+            "max_depth": self.max_depth,
+            "tt_hits": self.tt_hits,
+            "tt_misses": self.tt_misses,
+            "prunes": dict(self.prunes),
+            "seconds": self.seconds,
+            "solve_seconds": self.solve_seconds,
+            "result": self.result,
+            "repair": self.repair,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name, value in data.items():
+            setattr(stats, name, value)
+        stats.prunes = dict(stats.prunes)
+        return stats
+
+
+class GenerationStats:
+    """
+    generate_filled_solvable_board 1回ぶんの統計。試行ごとの AttemptStats を持つ。
+    reason は生成の終わり方:
+      "solved"      解ける盤面が見つかった
+      "constructed" 逆再生で作れた
+      "timeout"     時間切れ (最後の候補を検証なしで返した)
+      "max_tries"   試行回数の上限に達した
+      "dead_end"    逆再生が作り直しの上限まで行き詰まった (このあと探索方式に切り替わる)
+    """
+
+    def __init__(self, rows, cols, colors, method):
+        self.rows = rows
+        self.cols = cols
+        self.colors = colors
+        self.method = method
+        self.attempts = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.reason = None
+        self.verified = False
+
+    @property
+    def nodes(self):
+        return sum(a.nodes for a in self.attempts)
+
+    @property
+    def max_depth(self):
+        return max((a.max_depth for a in self.attempts), default=0)
+
+    @property
+    def tt_hits(self):
+        return sum(a.tt_hits for a in self.attempts)
+
+    @property
+    def tt_misses(self):
+        return sum(a.tt_misses for a in self.attempts)
+
+    @property
+    def prunes(self):
+        totals = {}
+        for attempt in self.attempts:
+            for name, count in attempt.prunes.items():
+                totals[name] = totals.get(name, 0) + count
+        return totals
+
+    @property
+    def repairs(self):
+        """修繕した盤面を試した回数。"""
+        return sum(1 for a in self.attempts if a.repair)
+
+    def results(self):
+        """試行の終わり方ごとの件数。"""
+        counts = {}
+        for attempt in self.attempts:
+            counts[attempt.result] = counts.get(attempt.result, 0) + 1
+        return counts
+
+    def summary(self):
+        """ログ1行ぶんの要約。"""
+        probes = self.tt_hits + self.tt_misses
+        hit_rate = self.tt_hits / probes if probes else 0.0
+        return (f"{self.rows}x{self.cols}x{self.colors} {self.method}: "
+                f"{self.reason} after {len(self.attempts)} attempts "
+                f"in {self.seconds:.2f}s, nodes {self.nodes}, "
+                f"max depth {self.max_depth}, TT hit rate {hit_rate:.1%}, "
+                f"prunes {self.prunes}, repairs {self.repairs}, "
+                f"results {self.results()}")
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "cols": self.cols,
+            "colors": self.colors,
+            "method": self.method,
+            "reason": self.reason,
+            "verified": self.verified,
+            "seconds": self.seconds,
+            "nodes": self.nodes,
+            "max_depth": self.max_depth,
+            "tt_hits": self.tt_hits,
+            "tt_misses": self.tt_misses,
+            "prunes": self.prunes,
+            "repairs": self.repairs,
+            "attempts": [a.to_dict() for a in self.attempts],
+        }
+
+
+class PipelineStats:
+    """
+    iter_solvable_boards の段ごとの統計。
+    counts: 段ごとの件数
+      "candidates"   作った候補盤面
+      "prefiltered"  ソルバに渡す前に枝刈りルールで落とした
+      "unsolvable"   ソルバで解けないと分かった
+      "unknown"      ソルバが時間切れになった (unknown_boards に取っておく)
+      "repaired"     解けなかった盤面を修繕して、もう一度流した
+      "solved"       解けると確認できて渡した
+    seconds: 段ごとにかかった時間 ("generate", "prefilter", "solve", "repair")
+    """
+
+    STAGES = ("generate", "prefilter", "solve", "repair")
+
+    def __init__(self, rows, cols, colors):
+        self.rows = rows
+        self.cols = cols
+        self.colors = colors
+        self.counts = {"candidates": 0, "prefiltered": 0, "unsolvable": 0,
+                       "unknown": 0, "repaired": 0, "solved": 0}
+        self.seconds = {stage: 0.0 for stage in self.STAGES}
+        self.nodes = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def boards_per_sec(self):
+        elapsed = self.elapsed
+        return self.counts["solved"] / elapsed if elapsed else 0.0
+
+    def summary(self):
+        """ログ1行ぶんの要約。"""
+        seconds = ", ".join(f"{stage} {self.seconds[stage]:.2f}s" for stage in self.STAGES)
+        return (f"{self.rows}x{self.cols}x{self.colors} stream: "
+                f"{self.counts['solved']} boards in {self.elapsed:.2f}s "
+                f"({self.boards_per_sec:.1f}/s), counts {self.counts}, "
+                f"nodes {self.nodes}, {seconds}")
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "cols": self.cols,
+            "colors": self.colors,
+            "counts": dict(self.counts),
+            "seconds": dict(self.seconds),
+            "nodes": self.nodes,
+            "elapsed": self.elapsed,
+            "boards_per_sec": self.boards_per_sec,
+        }
+
+
 class BoardGenerator:
-    def __init__(self, max_tries=1000):
+    def __init__(self, max_tries=1000, tt_size=1 << 18, move_order="raster",
+                 pruning=tuple(PRUNING_RULES), canonical_colors=False,
+                 state_type="bitboard", repair_tries=3, board_params=None,
+                 partial_order=False):
         """
         max_tries: ランダム生成→判定を繰り返す最大回数
+        tt_size: ソルバの置換表のスロット数 (メモリはこれに比例して一定)
+        move_order: ソルバが手を試す順番 (MOVE_ORDERINGS のキー)
+        pruning: 探索中に使う枝刈りルール (PRUNING_RULES のキーの並び)
+        canonical_colors: 色を付け替えただけの局面で置換表の項目を共有する。
+                          1手ごとのハッシュ更新が重くなるので、既定では使わない
+        state_type: ソルバの盤面の表現 (STATE_TYPES のキー)
+        repair_tries: 解けないと分かった候補を捨てる前に、少し書き換えて試し直す回数
+                      (REPAIR_MUTATIONS)。0 なら修繕しない
+        board_params: 盤面の大きさごとの生成パラメータ ({"RxCxK": {...}})。
+                      省略時は assets/board_params.json を読む (generation_params)
+        partial_order: 順番を入れ替えても同じ局面になる2手を片方の順でしか試さない
+                       (スリープ集合)。展開する局面は減るが1手ごとの判定が増えるので、
+                       既定では使わない
         """
+        if move_order not in MOVE_ORDERINGS:
+            raise ValueError(f"Unknown move_order: {move_order}")
+        for name in pruning:
+            if name not in PRUNING_RULES:
+                raise ValueError(f"Unknown pruning rule: {name}")
+        if state_type not in STATE_TYPES:
+            raise ValueError(f"Unknown state_type: {state_type}")
+        if canonical_colors and state_type != "bitboard":
+            raise ValueError("canonical_colors needs state_type='bitboard'")
+        if repair_tries < 0:
+            raise ValueError(f"repair_tries must be >= 0: {repair_tries}")
+        self.pruning = [(name, PRUNING_RULES[name]) for name in pruning]
+        self.prune_counts = {name: 0 for name in pruning}  # ルールごとの枝刈り回数 (累計)
         self.max_tries = max_tries
         self.EMPTY = -1  # 空セルの表現
+        self.transposition_table = TranspositionTable(tt_size)
+        self.move_order = move_order
+        self.canonical_colors = canonical_colors
+        self.state_type = state_type
+        self.repair_tries = repair_tries
+        self.partial_order = partial_order
+        self.board_params = load_board_params() if board_params is None else board_params
+        self.last_stats = None  # 直近の生成の統計 (GenerationStats)
+        self.last_solver_stats = None  # 直近のソルバ1回ぶんの統計 (AttemptStats)
+        self.last_pipeline_stats = None  # 直近の iter_solvable_boards の統計 (PipelineStats)
+        self.last_solution = None  # 直近に生成した盤面の解 (分かっている場合のみ)
+        self.last_board_verified = False  # 直近の盤面が解けると確認できたか
+        # 時間切れで判定できなかった ((rows, cols, colors), 盤面, 判定し直した回数)
+        # (recheck_unknown_board で検証し直せる)
+        self.unknown_boards = deque(maxlen=16)
+        # 盤面生成専用の乱数。グローバルな random には触れないので、
+        # seed を渡せば他の処理に左右されず同じ盤面を作り直せる
+        self.rng = random.Random()
 
-    def generate_filled_solvable_board(self, rows, cols, colors, timeout=3):
+    def generate_filled_solvable_board(self, rows, cols, colors, timeout=3,
+                                       method="search", workers=None,
+                                       batch_size=None, seed=None):
         """
+        method="search" (従来の方式):
         1) 大きめブロックを意図的に作る方式で盤面をランダム生成
         2) 解ソルバでチェック
         3) 解けたら返す
+        method="reverse":
+        空の盤面からゲームを逆再生して作る。必ず解けて、解は last_solution に入る。
+        workers: 2以上なら "search" の候補をプロセスプールで並列に試す
+        batch_size: 指定すると候補を NumPy でまとめて作って順位付けし、
+                    有望なものからソルバに渡す (numpy がなければ無視)
+        seed: 指定すると同じ (seed, rows, cols, colors, method) から必ず同じ盤面を作る。
+              ただし "search" で時間切れになった場合は、どこで打ち切られたかで変わる
+        """
+        self.last_solution = None
+        self.last_board_verified = False
+        if seed is not None:
+            self.rng.seed(seed)
+        if method == "reverse":
+            board = self._generate_reverse_board(rows, cols, colors)
+            if board is not None:
+                return board
+            # 呼び出し側の timeout と seed のまま、従来の探索方式で作り直す
+            print("Debug: Reverse generation failed, falling back to search.")
+            return self.generate_filled_solvable_board(
+                rows, cols, colors, timeout=timeout, workers=workers,
+                batch_size=batch_size, seed=seed)
+        if method != "search":
+            raise ValueError(f"Unknown generation method: {method}")
+        if workers and workers > 1:
+            return self._generate_parallel(rows, cols, colors, timeout, workers,
+                                           ordered=seed is not None)
+
+        return _run_steps(self._generate_steps(rows, cols, colors, timeout, batch_size))
+
+    def iter_solvable_boards(self, rows, cols, colors, timeout=None, batch_size=None,
+                             seed=None, yield_steps=False, clock=time.perf_counter):
+        """
+        解けると確認できた盤面を次々に返すイテレータ。
+        候補の生成 → 枝刈りルールによる安いふるい分け → ソルバ、を流れ作業で回し、
+        解けた盤面だけを yield する。generate_filled_solvable_board を何度も呼ぶのと違い、
+        1枚ごとに乱数を初期化し直したり、NumPy で順位付けした残りの候補を捨てたりしない。
+        timeout: 候補1枚あたりのソルバの最大秒数 (時間切れの盤面は unknown_boards へ)。
+                 省略時は generation_params の candidate_timeout、それもなければ 3 秒
+        batch_size: generate_filled_solvable_board と同じ
+        seed: 指定すると最初に1回だけ self.rng を初期化する
+        yield_steps: True なら盤面のほかに None も yield して、ソルバの途中
+                     (SOLVER_STEP_NODES 局面ごと) と候補を捨てたところで処理を譲る
+                     (呼び出し側が候補の途中でも止まれるように)
+        clock: timeout を数える時計。StepClock を渡すと、next() の外で止まっている
+               間は数えない
+        段ごとの件数と時間は last_pipeline_stats (PipelineStats) で途中でも見られる。
+        """
+        if seed is not None:
+            self.rng.seed(seed)
+        if timeout is None:
+            timeout = self.generation_params(rows, cols, colors)["candidate_timeout"] or 3
+        stats = PipelineStats(rows, cols, colors)
+        self.last_pipeline_stats = stats
+        state_type = STATE_TYPES[self.state_type]
+        candidates = self._candidates(rows, cols, colors, batch_size)
+        repaired = None
+        repair = 0
+
+        while True:
+            started = time.perf_counter()
+            if repaired is not None:
+                board = repaired
+                repair += 1
+                stats.counts["repaired"] += 1
+            else:
+                board = next(candidates)
+                repair = 0
+                stats.counts["candidates"] += 1
+            repaired = None
+            generated = time.perf_counter()
+            stats.seconds["generate"] += generated - started
+
+            pruned = self._is_pruned(state_type.from_board(board, self.EMPTY))
+            filtered = time.perf_counter()
+            stats.seconds["prefilter"] += filtered - generated
+            if pruned:
+                stats.counts["prefiltered"] += 1
+                repaired = self._repair_steps(board, repair, stats)
+                if yield_steps:
+                    yield None
+                continue
+
+            attempt = AttemptStats()
+            solving = self._is_solvable_steps(board, Deadline(timeout, clock), attempt)
+            if yield_steps:
+                result = yield from solving
+            else:
+                result = _run_steps(solving)
+            stats.seconds["solve"] += time.perf_counter() - filtered
+            stats.nodes += attempt.nodes
+            if result == SOLVABLE:
+                stats.counts["solved"] += 1
+                self.last_solution = None
+                self.last_board_verified = True
+                yield board
+            elif result == UNKNOWN:
+                stats.counts["unknown"] += 1
+                self.unknown_boards.append(((rows, cols, colors), board, 0))
+            else:
+                stats.counts["unsolvable"] += 1
+                repaired = self._repair_steps(board, repair, stats)
+            if result != SOLVABLE and yield_steps:
+                yield None
+
+    def _repair_steps(self, board, repair, stats):
+        """
+        iter_solvable_boards の修繕の段。repair 回目の修繕まで済んだ board を
+        もう一度書き換えて返す。上限に達したか直す場所がなければ None。
+        """
+        if repair >= self.repair_tries:
+            return None
+        started = time.perf_counter()
+        repaired = self._repair_board(board)
+        stats.seconds["repair"] += time.perf_counter() - started
+        return repaired
+
+    def _repair_board(self, board):
+        """
+        解けないと分かった盤面を REPAIR_MUTATIONS で REPAIR_CELLS か所まで書き換えた
+        新しい盤面を返す (元の盤面はそのまま)。直す場所がなければ None。
+        置換表は「解けない局面」だけを覚えているので、書き換えたセルを消したあとの局面など、
+        前回の探索で調べ済みの局面はそのまま使い回される。
+        """
+        repaired = [row[:] for row in board]
+        changed = False
+        for _ in range(REPAIR_CELLS):
+            for mutate in REPAIR_MUTATIONS.values():
+                if mutate(repaired, self.rng, self.EMPTY):
+                    changed = True
+                    break
+            else:
+                break  # どの修繕も当てはまらない
+        return repaired if changed else None
+
+    def start_generation(self, rows, cols, colors, timeout=3, method="search",
+                         batch_size=None, seed=None):
+        """
+        少しずつ進められる盤面生成を始める。
+        戻り値の ResumableTask.step() を毎フレーム呼ぶと、終わったときに result に盤面が入る。
+        スレッドもプロセスも使えない Web 版で、画面を止めずに生成するためのもの。
+        timeout は step() の中で使った時間で数える (フレームの合間は数えないので、
+        1フレームに使う時間が短くても generate_filled_solvable_board と同じだけ探せる)。
+        """
+        self.last_solution = None
+        self.last_board_verified = False
+        if seed is not None:
+            self.rng.seed(seed)
+        if method not in ("search", "reverse"):
+            raise ValueError(f"Unknown generation method: {method}")
+        clock = StepClock()
+        if method == "reverse":
+            return ResumableTask(
+                self._reverse_steps(rows, cols, colors, timeout, batch_size, seed, clock),
+                clock)
+        return ResumableTask(
+            self._generate_steps(rows, cols, colors, timeout, batch_size, clock), clock)
+
+    def start_solving(self, board, timeout=3):
+        """
+        少しずつ進められるソルバを始める。timeout は step() の中で使った時間で数える。
+        終わると result に SOLVABLE / UNSOLVABLE / UNKNOWN (時間切れ) が入る。
+        """
+        clock = StepClock()
+        return ResumableTask(self._is_solvable_steps(board, Deadline(timeout, clock)), clock)
+
+    def recheck_unknown_board(self, rows, cols, colors, timeout=3):
+        """
+        時間切れで判定できなかった盤面 (unknown_boards) のうち、大きさと色数が
+        合う一番新しいものを取り出して、もう一度判定する。置換表には前回「解けない」と
+        分かった局面が残っているので、前回の探索の続きから調べることになる。
+        解ければその盤面、だめなら None。また時間切れなら後回しにするが、
+        UNKNOWN_RECHECKS 回判定し直しても分からない盤面は捨てる。
+        """
+        return _run_steps(self._recheck_steps(rows, cols, colors, Deadline(timeout)))
+
+    def start_recheck(self, rows, cols, colors, timeout=3):
+        """
+        少しずつ進められる recheck_unknown_board。timeout は step() の中で使った時間で数える。
+        終わると result に盤面 (解けなければ None) が入る。
+        """
+        clock = StepClock()
+        return ResumableTask(
+            self._recheck_steps(rows, cols, colors, Deadline(timeout, clock)), clock)
+
+    def _recheck_steps(self, rows, cols, colors, deadline):
+        for entry in reversed(self.unknown_boards):
+            if entry[0] == (rows, cols, colors):
+                break
+        else:
+            return None
+        self.unknown_boards.remove(entry)
+        size, board, rechecks = entry
+        result = yield from self._is_solvable_steps(board, deadline)
+        if result == SOLVABLE:
+            self.last_board_verified = True
+            return board
+        if result == UNKNOWN and rechecks + 1 < UNKNOWN_RECHECKS:
+            self.unknown_boards.appendleft((size, board, rechecks + 1))  # 後回しにする
+        return None
+
+    def _reverse_steps(self, rows, cols, colors, timeout, batch_size, seed, clock):
+        # 逆再生はセル数に比例する時間で終わるので、1回で作り切る
+        board = self._generate_reverse_board(rows, cols, colors)
+        if board is not None:
+            return board
+        # generate_filled_solvable_board と同じく、timeout と seed のまま探索方式で作り直す
+        print("Debug: Reverse generation failed, falling back to search.")
+        if seed is not None:
+            self.rng.seed(seed)
+        return (yield from self._generate_steps(rows, cols, colors, timeout, batch_size,
+                                                clock))
+
+    def _generate_steps(self, rows, cols, colors, timeout, batch_size=None,
+                        clock=time.perf_counter):
+        """
+        ランダム生成→判定のループ本体。途中で何度も yield して処理を譲る。
+        最後に盤面を return する (StopIteration.value)。締め切りは clock で数える。
         """
-        start_time = time.time()  # 処理開始時刻
+        deadline = Deadline(timeout, clock)
         last_board = None  # 最後に生成した盤面
+        candidates = self._candidates(rows, cols, colors, batch_size)
+        candidate_timeout = self.generation_params(rows, cols, colors)["candidate_timeout"]
+        stats = self._begin_stats(rows, cols, colors, "search")
+        repaired = None  # 次に試す修繕済みの盤面
+        repair = 0
 
         for i in range(self.max_tries):
-            if time.time() - start_time > timeout:  # タイムアウトチェック
+            if deadline.expired():  # タイムアウトチェック
                 print(f"Debug: Timeout reached after {timeout} seconds.")
-                return last_board
-            if i % 1 == 0:
-                print(f"Debug: Attempt {i}")
-#                print(f"Debug: rows min max {rows} {round(rows/5)} {int(rows/2)}")
-                print(f"Debug: rows min max {rows} {round(rows/7)} {int(rows/2)}")
-            board = self._generate_blocky_board(
-                rows, cols, colors,
-#                min_block_size=round(rows / 5),
-#                min_block_size=1,
-                min_block_size=round(rows / 7),
-#                max_block_size=int(rows / 1.8)
-                max_block_size=min(2, int(rows / 2))
-            )
+                return self._finish_stats(stats, "timeout", last_board)
+            attempt = AttemptStats()
+            stats.attempts.append(attempt)
+            started = time.perf_counter()
+            if repaired is not None:
+                board = repaired
+                repair += 1
+            else:
+                board = next(candidates)
+                repair = 0
+            attempt.repair = repair
             last_board = board
+            attempt.seconds = time.perf_counter() - started
+            yield
 
-            if self._is_solvable(board, start_time, timeout):  # タイムアウト対応版
-                return board
+            attempt_deadline = deadline
+            if candidate_timeout is not None:
+                # 1枚に時間を使い切らず、次の候補に回す
+                attempt_deadline = Deadline(min(candidate_timeout, deadline.remaining()),
+                                            clock)
+            result = yield from self._is_solvable_steps(board, attempt_deadline, attempt)
+            if result == SOLVABLE:
+                self.last_board_verified = True
+                return self._finish_stats(stats, "solved", board)
+            repaired = None
+            if result == UNKNOWN:
+                # 解けないと決まったわけではないので、あとで検証し直せるよう取っておく
+                self.unknown_boards.append(((rows, cols, colors), board, 0))
+            elif repair < self.repair_tries:
+                repaired = self._repair_board(board)
     
         print("Debug: Max tries reached.")
-        return last_board
+        return self._finish_stats(stats, "max_tries", last_board)
+
+    def _begin_stats(self, rows, cols, colors, method):
+        """
+        生成1回ぶんの統計を始める。終わるまでの途中経過も last_stats で見られる。
+        """
+        stats = GenerationStats(rows, cols, colors, method)
+        self.last_stats = stats
+        return stats
+
+    def _finish_stats(self, stats, reason, board):
+        """
+        統計を締めてログに1行出し、board をそのまま返す。
+        """
+        stats.seconds = time.perf_counter() - stats.started
+        stats.reason = reason
+        stats.verified = self.last_board_verified
+        print(f"Debug: {stats.summary()}")
+        return board
+
+    def generation_params(self, rows, cols, colors):
+        """
+        候補生成のパラメータ。board_params (board_tuner.py で選んだ値) にあればそれを、
+        なければ従来の値を使う。
+          min_block_size / max_block_size: 「大きめブロック」方式のブロックの大きさ
+          candidate_timeout: 候補1枚の判定にかける最大秒数 (None なら生成全体の timeout まで)
+        """
+        params = {
+            "min_block_size": round(rows / 7),
+#            "max_block_size": int(rows / 1.8),
+            "max_block_size": min(2, int(rows / 2)),
+            "candidate_timeout": None,
+        }
+        params.update(self.board_params.get(params_key(rows, cols, colors), {}))
+        return params
+
+    def _candidates(self, rows, cols, colors, batch_size=None):
+        """
+        ソルバに渡す候補盤面を次々に返す。
+        batch_size があれば NumPy でまとめて作り、安い統計で有望な順に並べる
+        (1セルしかない色がある盤面はここで捨てる)。
+        """
+        params = self.generation_params(rows, cols, colors)
+        min_block_size = params["min_block_size"]
+        max_block_size = params["max_block_size"]
+
+        batch = None
+        if batch_size:
+            import board_batch
+            if board_batch.available():
+                batch = board_batch
+            else:
+                print("Debug: numpy is not available, batch ranking disabled.")
+
+        while True:
+            if batch is None:
+                yield self._generate_blocky_board(
+                    rows, cols, colors,
+#                    min_block_size=round(rows / 5),
+#                    min_block_size=1,
+                    min_block_size=min_block_size,
+                    max_block_size=max_block_size
+                )
+                continue
+
+            boards = batch.generate_candidate_batch(
+                self, batch_size, rows, cols, colors, min_block_size, max_block_size)
+            stats = batch.batch_statistics(boards, colors)
+            for index in batch.rank_candidates(stats):
+                yield boards[index].tolist()
+
+    def _generate_parallel(self, rows, cols, colors, timeout, workers, ordered=False):
+        """
+        候補盤面の生成と判定を workers 個のプロセスで競争させ、
+        最初に解けると分かった盤面を返す。見つかった時点で残りのワーカーは打ち切る。
+        ordered なら終わった順ではなく候補の順に結果を見るので、
+        seed が同じなら (時間切れにならない限り) 同じ盤面になる。
+        """
+        # Web 版 (pyxel app2html) ではプロセスを使えないので、必要なときだけ読み込む
+        import multiprocessing
+
+        deadline = Deadline(timeout)
+        config = (self.transposition_table.size, self.move_order,
+                  [name for name, _ in self.pruning], self.canonical_colors,
+                  self.state_type, self.board_params, self.partial_order)
+        # perf_counter の基準はプロセスごとに違いうるので、締め切りは壁時計の時刻で渡す
+        wall_deadline = time.time() + timeout
+        tasks = ((rows, cols, colors, self.rng.getrandbits(64), wall_deadline)
+                 for _ in range(self.max_tries))
+        last_board = None
+        stats = self._begin_stats(rows, cols, colors, f"search x{workers}")
+        reason = "max_tries"
+
+        pool = multiprocessing.Pool(workers, initializer=_init_candidate_worker,
+                                    initargs=config)
+        try:
+            imap = pool.imap if ordered else pool.imap_unordered
+            results = imap(_solve_candidate_worker, tasks)
+            for _ in range(self.max_tries):
+                remaining = deadline.remaining()
+                if remaining <= 0:
+                    print(f"Debug: Timeout reached after {timeout} seconds.")
+                    reason = "timeout"
+                    break
+                try:
+                    board, result, attempt = results.next(timeout=remaining)
+                except multiprocessing.TimeoutError:
+                    print(f"Debug: Timeout reached after {timeout} seconds.")
+                    reason = "timeout"
+                    break
+                except StopIteration:
+                    break
+                last_board = board
+                stats.attempts.append(AttemptStats.from_dict(attempt))
+                if result == UNKNOWN:
+                    self.unknown_boards.append(((rows, cols, colors), board, 0))
+                if result == SOLVABLE:
+                    self.last_board_verified = True
+                    reason = "solved"
+                    break
+        finally:
+            pool.terminate()  # 探索中のワーカーはここで止める
+            pool.join()
+        return self._finish_stats(stats, reason, last_board)
 
     def _generate_blocky_board(self, rows, cols, colors,
-                               min_block_size=3, max_block_size=8):
+                               min_block_size=3, max_block_size=8, seed=None):
         """
         「大きめブロックを意図的に作る」ランダム生成。
-        盤面をすべて埋めて返す。
+        盤面をすべて埋めて返す。seed を渡すと self.rng をその値で初期化してから作る。
         """
+        if seed is not None:
+            self.rng.seed(seed)
+        rng = self.rng
         # まずは空ボードを作る
         board = [[self.EMPTY for _ in range(cols)] for _ in range(rows)]
+        # 空きセルは毎回数え直さず、埋めるたびに O(1) で取り除く
+        empty_cells = FreeCells(rows, cols)
 
         # 空セルがある限り、大きめブロックを作って埋めていく
         while True:
-            empty_cells = [(r, c) for r in range(rows) for c in range(cols)
-                           if board[r][c] == self.EMPTY]
-
             if not empty_cells:
                 # 全部埋まったら終了
                 break
 
-            start_r, start_c = random.choice(empty_cells)
+            start_r, start_c = empty_cells.choice(rng)
 
             # ブロックサイズをランダムに決める
-            block_size = random.randint(min_block_size, max_block_size)
+            block_size = rng.randint(min_block_size, max_block_size)
 
             # 同色ブロックを形成するための「候補セル」一覧を生成
             # BFSやランダムウォークなどで block_size 個をなるべく確保
             group = self._make_random_block(board, start_r, start_c,
-                                            block_size, rows, cols)
+                                            block_size, rows, cols, empty_cells)
 
             # 実際に生成された group が 1 個 (最小) の場合もある
             # → group のサイズがあまりに小さければ適宜補う or そのまま
-            color = random.randint(0, colors - 1)
+            color = rng.randint(0, colors - 1)
 
             # groupのセルを同色で塗る
             for (r, c) in group:
@@ -82,10 +1638,11 @@ class BoardGenerator:
         return board
 
     def _make_random_block(self, board, start_r, start_c,
-                           desired_size, rows, cols):
+                           desired_size, rows, cols, empty_cells=None):
         """
         空きセルから連続する領域をなるべく desired_size 個確保する。
         BFS/DFS の変形で「拡張候補をランダムに加える」イメージ。
+        empty_cells (FreeCells) を渡すと、確保したセルをそこから取り除く。
         """
         # 既に埋まっている場所はスキップ
         if board[start_r][start_c] != self.EMPTY:
@@ -99,7 +1656,7 @@ class BoardGenerator:
             r, c = queue.popleft()
             # 上下左右からランダムに選んで順番を変える
             directions = [(1,0),(-1,0),(0,1),(0,-1)]
-            random.shuffle(directions)
+            self.rng.shuffle(directions)
 
             for dr, dc in directions:
                 nr, nc = r + dr, c + dc
@@ -113,23 +1670,334 @@ class BoardGenerator:
                             if len(group) >= desired_size:
                                 break
 
+        if empty_cells is not None:
+            for r, c in group:
+                empty_cells.discard(r, c)
         return group
 
+    # --------------------------------------------------
+    #  逆再生による生成
+    #  空の盤面に「同色の塊」を差し込んでいく。差し込む操作は
+    #  1手の消去 (消去→重力→列詰め) のちょうど逆になっている:
+    #    - 既存の列に塊を差し込み、上のセルを押し上げる (重力の逆)
+    #    - 新しい列を差し込み、右の列を押し出す (列詰めの逆)
+    #  差し込んだ塊の周りに同じ色が来ないように色を選ぶので、
+    #  差し込みと逆の順に消せば必ず全消しできる
+    # --------------------------------------------------
+
+    def _generate_reverse_board(self, rows, cols, colors, max_block_size=3,
+                                max_restarts=100):
+        """
+        逆再生で盤面を作って返す。解 (上から順に消すセルの一覧) は last_solution に入る。
+        行き詰まったら作り直し、それでもダメなら None (呼び出し側が探索方式に切り替える)。
+        """
+        stats = self._begin_stats(rows, cols, colors, "reverse")
+        for _ in range(max_restarts):
+            attempt = AttemptStats()
+            stats.attempts.append(attempt)
+            started = time.perf_counter()
+            result = self._try_reverse_board(rows, cols, colors, max_block_size)
+            attempt.seconds = time.perf_counter() - started
+            if result is not None:
+                board, solution = result
+                attempt.result = "constructed"
+                self.last_solution = solution
+                self.last_board_verified = True
+                return self._finish_stats(stats, "constructed", board)
+            attempt.result = "dead_end"
+        return self._finish_stats(stats, "dead_end", None)
+
+    def _try_reverse_board(self, rows, cols, colors, max_block_size,
+                           max_samples=50):
+        """
+        逆再生を1回試す。成功すれば (盤面, 解)、行き詰まれば None。
+        列は下から上へのリストで持つ。
+        """
+        columns = []
+        moves = []
+        remaining = rows * cols
+        while remaining:
+            for _ in range(max_samples):
+                placement = self._sample_reverse_placement(
+                    columns, rows, cols, max_block_size)
+                if placement is None:
+                    continue
+                cells = self._insert_reverse_block(columns, *placement)
+                color = self._choose_reverse_color(columns, cells, colors)
+                if color is None:
+                    self._undo_reverse_block(columns, *placement)
+                    continue
+                for c, y in cells:
+                    columns[c][y] = color
+                c, y = cells[0]
+                moves.append((rows - 1 - y, c))
+                remaining -= len(cells)
+                break
+            else:
+                return None
+
+        board = [[columns[c][rows - 1 - r] for c in range(cols)]
+                 for r in range(rows)]
+        moves.reverse()
+        return board, moves
+
+    def _sample_reverse_placement(self, columns, rows, cols, max_block_size):
+        """
+        差し込み方をランダムに1つ選ぶ。(種類, 列, 高さ, 長さ) か、選べなければ None。
+        どの列も「空きがちょうど1つ」にならないようにする
+        (長さ2以上の塊では埋められなくなるため)。
+        """
+        max_block_size = max(3, max_block_size)
+        spare_columns = cols - len(columns)
+        free = [rows - len(column) for column in columns]
+        new_capacity = spare_columns * rows
+        total = sum(free) + new_capacity
+
+        if self.rng.random() * total < new_capacity:
+            # 列詰めの逆: 新しい列を差し込む
+            position = self.rng.randint(0, len(columns))
+            if spare_columns >= 2 and rows > 2 and self.rng.random() < 0.3:
+                length = self.rng.randint(2, min(max_block_size, spare_columns))
+                return ("new_row", position, 0, length)
+            lengths = [k for k in range(2, min(max_block_size, rows) + 1)
+                       if rows - k != 1]
+            return ("new_column", position, 0, self.rng.choice(lengths))
+
+        start = self.rng.randrange(len(columns))
+        if self.rng.random() < 0.4:
+            # 横向きの塊: 連続する列の同じ高さに1セルずつ
+            run = 0
+            while (start + run < len(columns) and run < max_block_size
+                   and free[start + run] != 0 and free[start + run] != 2):
+                run += 1
+            if run < 2:
+                return None
+            length = self.rng.randint(2, run)
+            height = self.rng.randint(
+                0, min(len(columns[c]) for c in range(start, start + length)))
+            return ("row", start, height, length)
+
+        # 縦向きの塊: 1つの列の途中に差し込む
+        lengths = [k for k in range(2, min(max_block_size, free[start]) + 1)
+                   if free[start] - k != 1]
+        if not lengths:
+            return None
+        height = self.rng.randint(0, len(columns[start]))
+        return ("column", start, height, self.rng.choice(lengths))
+
+    def _insert_reverse_block(self, columns, kind, col, height, length):
+        """
+        仮の色 (None) で塊を差し込み、差し込んだセル (列, 高さ) の一覧を返す。
+        """
+        if kind == "column":
+            columns[col][height:height] = [None] * length
+            return [(col, height + i) for i in range(length)]
+        if kind == "row":
+            for c in range(col, col + length):
+                columns[c].insert(height, None)
+            return [(c, height) for c in range(col, col + length)]
+        if kind == "new_column":
+            columns.insert(col, [None] * length)
+            return [(col, i) for i in range(length)]
+        # new_row
+        columns[col:col] = [[None] for _ in range(length)]
+        return [(c, 0) for c in range(col, col + length)]
+
+    def _undo_reverse_block(self, columns, kind, col, height, length):
+        if kind == "column":
+            del columns[col][height:height + length]
+        elif kind == "row":
+            for c in range(col, col + length):
+                del columns[c][height]
+        else:
+            del columns[col:col + (1 if kind == "new_column" else length)]
+
+    def _choose_reverse_color(self, columns, cells, colors):
+        """
+        差し込んだ塊の周りにない色をランダムに選ぶ。なければ None。
+        """
+        used = set()
+        for c, y in cells:
+            for nc, ny in ((c, y - 1), (c, y + 1), (c - 1, y), (c + 1, y)):
+                if 0 <= nc < len(columns) and 0 <= ny < len(columns[nc]):
+                    used.add(columns[nc][ny])
+        choices = [color for color in range(colors) if color not in used]
+        return self.rng.choice(choices) if choices else None
+
+    def verify_solution(self, board, solution):
+        """
+        solution (上から順に消すセル (r, c) の一覧) で board が全消しできるか確かめる。
+        """
+        state = BitBoard.from_board(board, self.EMPTY)
+        for r, c in solution:
+            found = state.group_at(r, c)
+            if found is None or _popcount(found[1]) < 2:
+                return False
+            state = state.remove(*found)
+        return state.is_empty()
+
+    # --------------------------------------------------
+    #  パースコア (その盤面で狙える高得点の目安)
+    #  得点はゲーム本体 (handle_click) と同じく 1手 int(n**3 * score_multiplier)、
+    #  全消しできたら合計の clear_bonus 倍をボーナスとして足す
+    # --------------------------------------------------
+
+    def find_par_score(self, board, score_multiplier=1.0, time_budget=0.5,
+                       beam_width=16, clear_bonus=0.75):
+        """
+        ビームサーチで高得点の手順を探し、(手順, 得点) を返す。
+        手順は verify_solution と同じ (上から順に消すセル (r, c) の一覧)。
+        まず貪欲法 (幅1) で必ず1つ答えを作り、時間が残っている間は
+        beam_width から幅を倍々にして探し直す。盤面によって向き不向きがあるので、
+        幅ごとに PAR_POTENTIALS の見込み点を順に試す。time_budget 秒を過ぎた探索は
+        その時点で一番有望な局面から貪欲法で最後まで進めて打ち切る。
+        """
+        return _run_steps(self._par_score_steps(board, score_multiplier, time_budget,
+                                                beam_width, clear_bonus))
+
+    def start_par_search(self, board, score_multiplier=1.0, time_budget=0.5,
+                         beam_width=16, clear_bonus=0.75):
+        """
+        少しずつ進められる find_par_score。終わると result に (手順, 得点) が入る。
+        time_budget は step() の中で使った時間で数える (処理を譲っている間は数えない)。
+        """
+        clock = StepClock()
+        return ResumableTask(self._par_score_steps(board, score_multiplier, time_budget,
+                                                   beam_width, clear_bonus, clock), clock)
+
+    def _par_score_steps(self, board, score_multiplier, time_budget, beam_width,
+                         clear_bonus, clock=time.perf_counter):
+        deadline = Deadline(time_budget, clock)
+        root = BitBoard.from_board(board, self.EMPTY)
+        best = yield from self._beam_search_steps(root, score_multiplier, 1, clear_bonus,
+                                                  PAR_POTENTIALS[0])
+        width = beam_width
+        while not deadline.expired():
+            for potential in PAR_POTENTIALS:
+                if deadline.expired():
+                    break
+                result = yield from self._beam_search_steps(
+                    root, score_multiplier, width, clear_bonus, potential, deadline)
+                if result[1] > best[1]:
+                    best = result
+            width *= 2
+        groups, score = best
+        return self._par_moves(root, groups), score
+
+    def _beam_search_steps(self, root, multiplier, width, clear_bonus, potential,
+                           deadline=None, start_score=0):
+        """
+        1手ずつ全部の手を試し、「得点 + 残り盤面の見込み (potential)」の
+        上位 width 局面だけ残す。
+        同じ局面に別の手順で着いたら得点の高い方だけ残す。
+        戻り値は (消した塊のマスクの一覧, 全消しボーナス込みの得点)。
+        deadline (Deadline) を過ぎたら、一番有望な局面から貪欲法で終わらせる。
+        局面を1つ広げるごと・見込み点を PAR_STEP_STATES 個求めるごとに yield する。
+        """
+        best_score = -1
+        best_path = None
+        # (得点, 局面, 手順) 手順は (塊, 前の手順) の連結リストで、枝分かれしても共有する
+        beam = [(start_score, root, None)]
+        tail = []
+        while beam:
+            children = {}
+            for score, state, path in beam:
+                groups = state.groups()
+                if not groups:
+                    if state.is_empty():
+                        score += int(score * clear_bonus)
+                    if score > best_score:
+                        best_score = score
+                        best_path = path
+                    continue
+                for color, group in groups:
+                    child_score = score + int(_popcount(group) ** 3 * multiplier)
+                    child = state.remove(color, group)
+                    known = children.get(child.zobrist)
+                    if known is None or known[0] < child_score:
+                        children[child.zobrist] = (child_score, child, (group, path))
+                yield
+
+            candidates = list(children.values())
+            keys = []
+            for i, (score, state, _) in enumerate(candidates, 1):
+                keys.append(score + potential(state, multiplier))
+                if not i % PAR_STEP_STATES:
+                    yield
+            order = sorted(range(len(candidates)), key=keys.__getitem__, reverse=True)
+            ranked = [candidates[i] for i in order]
+            if ranked and deadline is not None and deadline.expired():
+                score, state, path = ranked[0]
+                tail, score = yield from self._beam_search_steps(
+                    state, multiplier, 1, clear_bonus, potential, start_score=score)
+                if score > best_score:
+                    best_score = score
+                    best_path = path
+                else:
+                    tail = []
+                break
+            beam = ranked[:width]
+
+        groups = []
+        while best_path is not None:
+            group, best_path = best_path
+            groups.append(group)
+        return groups[::-1] + tail, max(best_score, 0)
+
+    def _par_moves(self, root, groups):
+        """
+        消した塊のマスクの並びを、(r, c) の手順に直す。
+        """
+        moves = []
+        state = root
+        for group in groups:
+            low = group & -group
+            c, y = divmod(low.bit_length() - 1, state.stride)
+            r = state.rows - 1 - y
+            moves.append((r, c))
+            state = state.remove(*state.group_at(r, c))
+        return moves
+
     # --------------------------------------------------
     #  以下は「ソルバ (クリア可能性チェック)」のロジック
     #  大きい盤面だと時間がかかるので、メモ化など工夫が推奨
     # --------------------------------------------------
 
-    def _is_solvable(self, board, start_time, timeout):
+    def _is_solvable(self, board, deadline):
         """
         この盤面が最後まで消せるかどうかを判定する（簡易版）。
-        必要に応じてメモ化を入れると高速化できます。
+        SOLVABLE / UNSOLVABLE / UNKNOWN (deadline までに決まらなかった) を返す。
+        探索はビットボード (BitBoard) 上で行い、盤面のコピーを作らない。
+        解けないと分かった局面は置換表に Zobrist ハッシュで記録する。
         """
-        # すぐ済む軽いケース向けの簡易実装。
-        # 大きいサイズ・色数5などでは計算量が跳ね上がるため注意。
-        memo = {}
-        board_key = self._board_to_key(board)
-        return self._is_solvable_impl(board, memo, board_key, start_time, timeout)
+        return _run_steps(self._is_solvable_steps(board, deadline))
+
+    def _is_solvable_steps(self, board, deadline, stats=None):
+        """
+        _is_solvable の中断できる版。SOLVER_STEP_NODES 局面ごとに yield する。
+        stats (AttemptStats) を渡すとそこに統計を足し込む。
+        どちらの場合も last_solver_stats に今回の統計が入る。
+        """
+        if stats is None:
+            stats = AttemptStats()
+        table = self.transposition_table
+        table.new_search()
+        table.reset_stats()
+        prune_counts = dict(self.prune_counts)
+        started = time.perf_counter()
+        state = STATE_TYPES[self.state_type].from_board(board, self.EMPTY,
+                                                        self.canonical_colors)
+        result = yield from self._is_solvable_impl(state, table, deadline, stats)
+        stats.tt_hits += table.hits
+        stats.tt_misses += table.probes - table.hits
+        for name, count in self.prune_counts.items():
+            if count > prune_counts[name]:
+                stats.prunes[name] = stats.prunes.get(name, 0) + count - prune_counts[name]
+        elapsed = time.perf_counter() - started
+        stats.seconds += elapsed
+        stats.solve_seconds += elapsed
+        self.last_solver_stats = stats
+        return result
 
 #    def _is_solvable_impl(self, board, memo, board_key):
 #        if self._is_all_empty(board):
@@ -155,36 +2023,148 @@ class BoardGenerator:
 #        memo[board_key] = False
 #        return False
 
-    def _is_solvable_impl(self, board, memo, board_key, start_time, timeout, timeout_flag=[False]):
-        if time.time() - start_time > timeout:  # タイムアウトチェック
-            if not timeout_flag[0]:  # 初めてタイムアウトが発生した場合のみプリント
-                print("Debug: Timeout reached inside _is_solvable_impl.")
-                timeout_flag[0] = True  # フラグを立てる
-            return False
-    
-        if self._is_all_empty(board):  # 盤面が空かチェック
-            return True
+    def _is_solvable_impl(self, state, table, deadline, stats):
+        """
+        明示的なスタックで深さ優先探索する (再帰しないので深い盤面でも安全)。
+        スタックの各要素は (局面, まだ試していない手のイテレータ)。
+        状態はすべてスタックにあるので、SOLVER_STEP_NODES 局面ごとに yield して
+        呼び出し側に処理を譲り、あとから続きを再開できる。
+        締め切り (deadline) も同じ間隔で確かめ、過ぎていれば UNKNOWN を返す。
+        展開した局面数・最大の深さ・終わり方は stats (AttemptStats) に記録する。
+
+        partial_order なら、スタックの各要素にスリープ集合 (この局面では試さない手) と
+        試し終えた手も持つ。兄弟の手 a を試したあとで手 b を試すとき、a が b と独立なら
+        a→b と b→a は同じ局面なので、b のあとでは a を試さない。
+        置換表には「解けない」局面しか入れないので、スリープ集合で飛ばした手があっても
+        記録は正しい (飛ばした先は、先に試して解けなかった兄弟の先と同じ局面)。
+        """
+        order = MOVE_ORDERINGS[self.move_order]
     
-        if board_key in memo:  # メモ化チェック
-            return memo[board_key]
+        if state.is_empty():  # 盤面が空かチェック
+            stats.result = "solved"
+            return SOLVABLE
     
-        groups = self._find_groups(board)
-        if not groups:
-            memo[board_key] = False
-            return False
+        if table.probe(state.zobrist) is not None:  # 置換表チェック (解けない局面のみ記録)
+            stats.result = "unsolvable"
+            return UNSOLVABLE
+
+        if self._is_pruned(state):  # 安い必要条件で先にふるい落とす
+            stats.result = "pruned"
+            return UNSOLVABLE
+
+        if deadline.expired():
+            stats.result = "timeout"
+            return UNKNOWN
     
-        for group in groups:
-            new_board = self._remove_group(board, group)
-            self._apply_gravity(new_board)
-            self._apply_compression(new_board)
-            new_key = self._board_to_key(new_board)
-            if self._is_solvable_impl(new_board, memo, new_key, start_time, timeout):
-                memo[board_key] = True
-                return True
+        partial_order = self.partial_order
+        # (局面, まだ試していない手のイテレータ, スリープ集合 {塊: 範囲}, 試し終えた手)
+        stack = [(state, iter(order(state, state.groups())),
+                  {} if partial_order else None, [] if partial_order else None)]
+        nodes = 0
+        while stack:
+            state, moves, sleep, done = stack[-1]
+            move = next(moves, None)
+            if move is None:
+                # すべての手を試して解けなかった
+                table.store(state.zobrist, 0, sum(state.color_counts()))
+                stack.pop()
+                continue
 
-        memo[board_key] = False
+            child_sleep = None
+            if sleep is not None:
+                if move[1] in sleep:
+                    stats.prunes["sleep_set"] = stats.prunes.get("sleep_set", 0) + 1
+                    continue
+                span = _move_span(state, move[1])
+                child_sleep = {group: other for group, other in sleep.items()
+                               if _spans_independent(span, other)}
+                for group, other in done:
+                    if _spans_independent(span, other):
+                        child_sleep[group] = other
+                done.append((move[1], span))
+
+            new_state = state.remove(*move)
+            nodes += 1
+            stats.nodes += 1
+            if not nodes % SOLVER_STEP_NODES:
+                if deadline.expired():  # タイムアウトチェック
+                    stats.result = "timeout"
+                    return UNKNOWN
+                yield
+            if new_state.is_empty():
+                stats.max_depth = max(stats.max_depth, len(stack))
+                stats.result = "solved"
+                return SOLVABLE
+            if table.probe(new_state.zobrist) is not None:
+                continue
+            if self._is_pruned(new_state):
+                table.store(new_state.zobrist, 0, sum(new_state.color_counts()))
+                continue
+            groups = new_state.groups()
+            if not groups:
+                table.store(new_state.zobrist, 0, sum(new_state.color_counts()))
+                continue
+            stack.append((new_state, iter(order(new_state, groups)), child_sleep,
+                          [] if partial_order else None))
+            if len(stack) > stats.max_depth:
+                stats.max_depth = len(stack)
+
+        stats.result = "unsolvable"
+        return UNSOLVABLE
+
+    def _is_pruned(self, state):
+        """
+        枝刈りルールを順に試し、最初に当たったルールの回数を数える。
+        """
+        for name, rule in self.pruning:
+            if rule(state):
+                self.prune_counts[name] += 1
+                return True
         return False
 
+    def compare_move_orderings(self, rows, cols, colors, boards=20,
+                               timeout=1.0, orderings=None, seed=0):
+        """
+        同じ盤面の組に対して手の並べ方ごとのソルバ性能を比べる。
+        戻り値は {並べ方: {"solved", "solve_rate", "nodes", "seconds", "nodes_per_sec"}}。
+        """
+        state = self.rng.getstate()
+        self.rng.seed(seed)
+        params = self.generation_params(rows, cols, colors)
+        candidates = [
+            self._generate_blocky_board(
+                rows, cols, colors,
+                min_block_size=params["min_block_size"],
+                max_block_size=params["max_block_size"])
+            for _ in range(boards)
+        ]
+        self.rng.setstate(state)
+
+        original_order = self.move_order
+        results = {}
+        try:
+            for name in orderings or MOVE_ORDERINGS:
+                self.move_order = name
+                solved = 0
+                nodes = 0
+                started = time.perf_counter()
+                for board in candidates:
+                    self.transposition_table.clear()
+                    if self._is_solvable(board, Deadline(timeout)) == SOLVABLE:
+                        solved += 1
+                    nodes += self.last_solver_stats.nodes
+                seconds = time.perf_counter() - started
+                results[name] = {
+                    "solved": solved,
+                    "solve_rate": solved / boards,
+                    "nodes": nodes,
+                    "seconds": seconds,
+                    "nodes_per_sec": nodes / seconds if seconds else 0.0,
+                }
+        finally:
+            self.move_order = original_order
+        return results
+
     def _board_to_key(self, board):
         """
         盤面をタプルに変換して辞書キー化。
@@ -239,36 +2219,21 @@ class BoardGenerator:
         rows = len(board)
         cols = len(board[0])
         for c in range(cols):
-            stack = []
-            for r in range(rows-1, -1, -1):
-                if board[r][c] != self.EMPTY:
-                    stack.append(board[r][c])
-            for r in range(rows-1, -1, -1):
-                if stack:
-                    board[r][c] = stack.pop(0)
-                else:
-                    board[r][c] = self.EMPTY
+            # 下から順に空でないセルを集め、下から詰め直す (列ごとに O(rows))
+            column = [board[r][c] for r in range(rows-1, -1, -1)
+                      if board[r][c] != self.EMPTY]
+            column.extend([self.EMPTY] * (rows - len(column)))
+            for y, color in enumerate(column):
+                board[rows-1-y][c] = color
 
     def _apply_compression(self, board):
-        rows = len(board)
         cols = len(board[0])
-        write_col = 0
-        for read_col in range(cols):
-            col_empty = True
-            for r in range(rows):
-                if board[r][read_col] != self.EMPTY:
-                    col_empty = False
-                    break
-            if not col_empty:
-                if write_col != read_col:
-                    for r in range(rows):
-                        board[r][write_col] = board[r][read_col]
-                write_col += 1
-
-        # 残りを空列に
-        for col in range(write_col, cols):
-            for r in range(rows):
-                board[r][col] = self.EMPTY
+        # 空でない列だけを残し、右側を空列で埋める (行ごとに1回の書き換え)
+        kept = [c for c in range(cols)
+                if any(row[c] != self.EMPTY for row in board)]
+        padding = [self.EMPTY] * (cols - len(kept))
+        for row in board:
+            row[:] = [row[c] for c in kept] + padding
 
     def _is_all_empty(self, board):
         for row in board:
@@ -287,6 +2252,52 @@ class BoardGenerator:
         print()
 
 
+# --------------------------------------------------
+#  並列生成用のワーカー (プロセス間で渡せるようにモジュール直下に置く)
+# --------------------------------------------------
+
+_worker_generator = None
+
+
+def _init_candidate_worker(tt_size, move_order, pruning, canonical_colors, state_type,
+                           board_params, partial_order):
+    """
+    ワーカープロセスごとに BoardGenerator を1つ作り、置換表を使い回す。
+    """
+    global _worker_generator
+    _worker_generator = BoardGenerator(tt_size=tt_size, move_order=move_order,
+                                       pruning=pruning,
+                                       canonical_colors=canonical_colors,
+                                       state_type=state_type,
+                                       board_params=board_params,
+                                       partial_order=partial_order)
+
+
+def _solve_candidate_worker(task):
+    """
+    候補盤面を1つ作って判定し、(盤面, ソルバの結果, 試行の統計の辞書) を返す。
+    fork したプロセスは乱数の状態まで同じなので、タスクごとの seed で初期化する。
+    """
+    rows, cols, colors, seed, wall_deadline = task
+    generator = _worker_generator
+    generator.rng.seed(seed)
+    params = generator.generation_params(rows, cols, colors)
+    started = time.perf_counter()
+    board = generator._generate_blocky_board(
+        rows, cols, colors,
+        min_block_size=params["min_block_size"],
+        max_block_size=params["max_block_size"]
+    )
+    attempt = AttemptStats()
+    attempt.seconds = time.perf_counter() - started
+    remaining = wall_deadline - time.time()
+    if params["candidate_timeout"] is not None:
+        remaining = min(remaining, params["candidate_timeout"])
+    deadline = Deadline(remaining)
+    result = _run_steps(generator._is_solvable_steps(board, deadline, attempt))
+    return board, result, attempt.to_dict()
+
+
 if __name__ == "__main__":
 #    rows, cols, colors = 6, 8, 5
 #    rows, cols, colors = 5, 5, 3
@@ -294,7 +2305,7 @@ if __name__ == "__main__":
 #    rows, cols, colors = 8, 12, 5
     rows, cols, colors = 9, 15, 5
 #    rows, cols, colors = 10, 18, 5
-    generator = SameGameBoardGenerator(max_tries=200)
+    generator = BoardGenerator(max_tries=200)
     board = generator.generate_filled_solvable_board(rows, cols, colors)
 
     if board is not None:
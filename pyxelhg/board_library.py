@@ -0,0 +1,312 @@
+import argparse
+import os
+import struct
+import time
+
+from board_generator import BoardGenerator
+
+# --------------------------------------------------
+#  盤面ライブラリ (.hgbl) の形式  ※数値はすべてリトルエンディアン
+#
+#  ヘッダ (32 バイト)
+#    magic "HGBL", version u16, header_size u16,
+#    rows u8, cols u8, colors u8, flags u8, record_size u32, count u32
+#  レコード (record_size バイト固定なので index から位置が O(1) で決まる)
+#    seed u64, solution_length u16, record_flags u16
+#    盤面: 1セル4ビット、上の行から左→右の順に2セルずつ1バイトへ詰める
+#    解 (FLAG_SOLUTIONS のときのみ): 1手 = (row u8, col u8) を cells // 2 手分
+# --------------------------------------------------
+
+MAGIC = b"HGBL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHBBBBII")
+HEADER_SIZE = 32
+RECORD_META = struct.Struct("<QHH")
+
+FLAG_SOLUTIONS = 1  # ヘッダ: 解の領域がある
+
+RECORD_VERIFIED = 1  # レコード: ソルバで解けると確認済み
+RECORD_CONSTRUCTED = 2  # レコード: 逆再生で作った (解つき)
+
+
+def _grid_bytes(rows, cols):
+    return (rows * cols + 1) // 2
+
+
+def _record_size(rows, cols, with_solutions):
+    size = RECORD_META.size + _grid_bytes(rows, cols)
+    if with_solutions:
+        size += (rows * cols // 2) * 2
+    return size
+
+
+def pack_board(board):
+    """
+    色番号の2次元リストを1セル4ビットに詰める。
+    """
+    cells = [cell for row in board for cell in row]
+    if len(cells) % 2:
+        cells.append(0)
+    return bytes((cells[i] & 0x0F) | ((cells[i + 1] & 0x0F) << 4)
+                 for i in range(0, len(cells), 2))
+
+
+def unpack_board(data, rows, cols):
+    cells = []
+    for byte in data:
+        cells.append(byte & 0x0F)
+        cells.append(byte >> 4)
+    return [cells[r * cols:(r + 1) * cols] for r in range(rows)]
+
+
+class BoardLibraryWriter:
+    """
+    盤面ライブラリを書き出す。既存のファイルなら末尾に追記する。
+    with 文で使うと、閉じるときにヘッダの件数を更新する。
+    """
+
+    def __init__(self, path, rows, cols, colors, with_solutions=True):
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.colors = colors
+        self.with_solutions = with_solutions
+        self.record_size = _record_size(rows, cols, with_solutions)
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            self.file = open(path, "r+b")
+            header = BoardLibrary.read_header(self.file.read(HEADER_SIZE))
+            if header["rows"] != rows or header["cols"] != cols or header["colors"] != colors:
+                self.file.close()
+                raise ValueError(f"{path} holds {header['rows']}x{header['cols']}x"
+                                 f"{header['colors']} boards")
+            self.with_solutions = bool(header["flags"] & FLAG_SOLUTIONS)
+            self.record_size = header["record_size"]
+            self.count = header["count"]
+        else:
+            self.file = open(path, "w+b")
+            self.count = 0
+            self._write_header()
+        self.file.seek(HEADER_SIZE + self.count * self.record_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_header(self):
+        flags = FLAG_SOLUTIONS if self.with_solutions else 0
+        header = HEADER.pack(MAGIC, VERSION, HEADER_SIZE, self.rows, self.cols,
+                             self.colors, flags, self.record_size, self.count)
+        self.file.seek(0)
+        self.file.write(header.ljust(HEADER_SIZE, b"\0"))
+
+    def append(self, board, solution=None, seed=0, flags=0):
+        """
+        盤面を1件追加する。solution は上から順に消すセル (row, col) の一覧。
+        """
+        solution = solution or []
+        record = RECORD_META.pack(seed & 0xFFFFFFFFFFFFFFFF, len(solution), flags)
+        record += pack_board(board)
+        if self.with_solutions:
+            moves = bytes(v for move in solution for v in move)
+            record += moves.ljust((self.rows * self.cols // 2) * 2, b"\0")
+        self.file.write(record)
+        self.count += 1
+
+    def last_seed(self):
+        """
+        最後のレコードの seed。まだ1件もなければ None。
+        """
+        if not self.count:
+            return None
+        self.file.seek(HEADER_SIZE + (self.count - 1) * self.record_size)
+        seed, _, _ = RECORD_META.unpack(self.file.read(RECORD_META.size))
+        self.file.seek(HEADER_SIZE + self.count * self.record_size)
+        return seed
+
+    def flush(self):
+        """
+        ヘッダの件数を書き込み、追記位置に戻る。
+        """
+        self._write_header()
+        self.file.seek(HEADER_SIZE + self.count * self.record_size)
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+
+class BoardLibrary:
+    """
+    盤面ライブラリをメモリマップで読む。レコードは固定長なので index 指定で O(1)。
+    mmap が使えない環境ではファイル全体を読み込む。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            import mmap
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ImportError, OSError, ValueError):
+            self.data = self.file.read()
+
+        header = self.read_header(self.data[:HEADER_SIZE])
+        self.rows = header["rows"]
+        self.cols = header["cols"]
+        self.colors = header["colors"]
+        self.with_solutions = bool(header["flags"] & FLAG_SOLUTIONS)
+        self.record_size = header["record_size"]
+        # 書き込み途中で止まったファイルでも、そろっているレコードだけ使う
+        complete = (len(self.data) - HEADER_SIZE) // self.record_size
+        self.count = min(header["count"], complete)
+
+    @staticmethod
+    def read_header(data):
+        if len(data) < HEADER.size:
+            raise ValueError("Board library header is truncated")
+        (magic, version, header_size, rows, cols, colors, flags,
+         record_size, count) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a board library file")
+        if version != VERSION or header_size != HEADER_SIZE:
+            raise ValueError(f"Unsupported board library version: {version}")
+        return {"rows": rows, "cols": cols, "colors": colors, "flags": flags,
+                "record_size": record_size, "count": count}
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if hasattr(self.data, "close"):
+            self.data.close()
+        self.file.close()
+
+    def _record(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        offset = HEADER_SIZE + index * self.record_size
+        return offset, RECORD_META.unpack_from(self.data, offset)
+
+    def board(self, index):
+        """
+        index 番目の盤面を色番号の2次元リストで返す。
+        """
+        offset, _ = self._record(index)
+        start = offset + RECORD_META.size
+        data = self.data[start:start + _grid_bytes(self.rows, self.cols)]
+        return unpack_board(data, self.rows, self.cols)
+
+    def solution(self, index):
+        """
+        index 番目の盤面の解 (row, col) の一覧。記録がなければ None。
+        """
+        offset, (_, length, _) = self._record(index)
+        if not self.with_solutions or not length:
+            return None
+        start = offset + RECORD_META.size + _grid_bytes(self.rows, self.cols)
+        data = self.data[start:start + length * 2]
+        return [(data[i], data[i + 1]) for i in range(0, len(data), 2)]
+
+    def metadata(self, index):
+        _, (seed, length, flags) = self._record(index)
+        return {"seed": seed, "solution_length": length, "flags": flags}
+
+    def board_for_seed(self, seed):
+        """
+        seed から決まる1枚を返す。同じ seed なら同じ盤面になる。
+        """
+        if not self.count:
+            return None
+        return self.board(seed % self.count)
+
+
+def library_filename(rows, cols, colors):
+    return f"{rows}x{cols}x{colors}.hgbl"
+
+
+def build_library(path, rows, cols, colors, count, method="reverse",
+                  timeout=None, seed=0):
+    """
+    BoardGenerator で解ける盤面を count 件作って path に追記する。
+    盤面ごとの seed は seed, seed + 1, ... で、確かめられずに捨てた盤面の分も進む。
+    途中で止めたファイルに追記するときは、最後に書いた盤面の seed の次から続ける。
+    "reverse" は盤面ごとにその seed で生成するので、同じ引数なら途中で止めて
+    再開しても同じ内容になる。
+    "search" は iter_solvable_boards で流し続け、seed は開始時 (再開時も) に1回だけ使う。
+    そのため再開した後の内容は止めずに作った場合と変わる (時間切れの起き方でも変わる)。
+    timeout: "search" では候補1枚あたりのソルバの秒数で、None なら調整済みの
+             candidate_timeout (generation_params)。それ以外では1枚あたりの秒数で、None なら 3
+    """
+    generator = BoardGenerator()
+    started = time.perf_counter()
+    with BoardLibraryWriter(path, rows, cols, colors) as writer:
+        # 捨てた盤面があると seed は件数より先に進んでいるので、件数からは決めない
+        last_seed = writer.last_seed()
+        next_seed = seed if last_seed is None else last_seed + 1
+        stream = None
+        if method == "search":
+            stream = generator.iter_solvable_boards(rows, cols, colors, timeout=timeout,
+                                                    seed=next_seed)
+        while writer.count < count:
+            board_seed = next_seed
+            next_seed += 1
+            if stream is not None:
+                board = next(stream)
+            else:
+                board = generator.generate_filled_solvable_board(
+                    rows, cols, colors, timeout=3 if timeout is None else timeout,
+                    method=method, seed=board_seed)
+            if not generator.last_board_verified:
+                continue
+            solution = generator.last_solution
+            flags = RECORD_CONSTRUCTED if solution else RECORD_VERIFIED
+            writer.append(board, solution, seed=board_seed, flags=flags)
+            if writer.count % 100 == 0:
+                writer.flush()
+                elapsed = time.perf_counter() - started
+                print(f"{writer.count}/{count} boards ({elapsed:.1f}s)")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Board library tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="fill a library with solvable boards")
+    build.add_argument("--rows", type=int, required=True)
+    build.add_argument("--cols", type=int, required=True)
+    build.add_argument("--colors", type=int, required=True)
+    build.add_argument("--count", type=int, default=1000)
+    build.add_argument("--method", choices=["reverse", "search"], default="reverse")
+    build.add_argument("--timeout", type=float,
+                       help="search: solver seconds per candidate, overriding the tuned "
+                            "candidate_timeout in assets/board_params.json; "
+                            "reverse: seconds per board (default: 3)")
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--out", help="output file (default: assets/board_library/RxCxK.hgbl)")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        out = args.out or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "assets", "board_library",
+            library_filename(args.rows, args.cols, args.colors))
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        build_library(out, args.rows, args.cols, args.colors, args.count,
+                      method=args.method, timeout=args.timeout, seed=args.seed)
+        print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import deque
+
+from board_generator import BoardGenerator, StepClock
+
+# 一時停止・終了を確かめる間隔のおおよその秒数 (判定し直しを1回に進める時間)
+PROVIDER_STEP = 0.005
+
+
+class BoardProvider:
+    """
+    メニュー画面にいる間に、全難易度の盤面をバックグラウンドで作り置きする。
+    難易度ごとに queue_size 枚まで用意しておき、take() ですぐに取り出せる。
+    作り置きがそろって手が空くと、ソルバが時間切れになった盤面を判定し直しておく。
+    スレッドが使えない環境 (Web 版) では available が False になり、何もしない。
+    """
+
+    def __init__(self, difficulty_levels, queue_size=2, timeout=None):
+        """
+        difficulty_levels: SameGame.difficulty_levels と同じ形の辞書
+        queue_size: 難易度ごとに作り置きする盤面の数
+        timeout: 候補1枚の判定にかける最大秒数。None なら generation_params
+                 (assets/board_params.json) の candidate_timeout を使う
+        """
+        self.difficulty_levels = difficulty_levels
+        self.queue_size = queue_size
+        self.timeout = timeout
+        # ゲーム側の BoardGenerator とは置換表を共有しない
+        self.generator = BoardGenerator()
+        self.ready = {key: deque() for key in difficulty_levels}
+        # 難易度ごとの (iter_solvable_boards, その締め切りを数える StepClock)
+        # 候補の判定の途中でも、一時停止をはさんでそのまま続きから進める
+        self.streams = {}
+        self.recheck = None  # 判定し直している途中の (難易度, ResumableTask)
+        # 時間切れだった盤面を手が空いたときに判定し直し、解けたもの (難易度ごと)
+        self.rechecked = {key: deque() for key in difficulty_levels}
+        self.lock = threading.Lock()
+        self.active = threading.Event()
+        self.stopped = False
+        self.thread = None
+        self.available = False
+
+    def start(self):
+        """
+        作り置き用のスレッドを起動する。起動直後は一時停止している。
+        """
+        if self.thread is not None:
+            return
+        thread = threading.Thread(target=self._run, name="BoardProvider", daemon=True)
+        try:
+            thread.start()
+        except RuntimeError as e:
+            # Web 版 (pyxel app2html) ではスレッドを起動できない
+            print(f"Debug: BoardProvider disabled: {e}")
+            return
+        self.thread = thread
+        self.available = True
+
+    def resume(self):
+        """作り置きを再開する (メニュー画面に入ったとき)。"""
+        self.active.set()
+
+    def pause(self):
+        """
+        作り置きを止める (ゲーム中)。判定中の候補もその場で止め、resume() で続きから進める。
+        止まっている間は判定の締め切りの時間も数えない。
+        """
+        self.active.clear()
+
+    def stop(self):
+        self.stopped = True
+        self.active.set()
+
+    def take(self, difficulty_key):
+        """
+        作り置きの盤面を1枚取り出す。なければ None。
+        """
+        with self.lock:
+            queue = self.ready.get(difficulty_key)
+            if queue:
+                return queue.popleft()
+        return None
+
+    def ready_count(self, difficulty_key):
+        with self.lock:
+            return len(self.ready.get(difficulty_key, ()))
+
+    def _next_key(self):
+        """
+        作り置きが一番少ない難易度を返す。全部そろっていれば None。
+        """
+        with self.lock:
+            key = min(self.ready, key=lambda k: len(self.ready[k]), default=None)
+            if key is None or len(self.ready[key]) >= self.queue_size:
+                return None
+            return key
+
+    def _candidate_timeout(self, rows, cols, colors):
+        if self.timeout is not None:
+            return self.timeout
+        return self.generator.generation_params(rows, cols, colors)["candidate_timeout"] or 3
+
+    def _recheck_step(self):
+        """
+        ソルバが時間切れになった盤面 (generator.unknown_boards) の判定し直しを
+        PROVIDER_STEP 秒ぶん進める。1枚にかけるのは候補1枚と同じ時間で、
+        時間切れならまた後回しになる
+        (UNKNOWN_RECHECKS 回で諦めるので、いずれ対象がなくなって眠る)。
+        解ければ rechecked に取っておき、次にその難易度の盤面が要るときに先に使う。
+        進めたら True、対象がなければ False。
+        """
+        if self.recheck is None:
+            self.recheck = self._start_recheck()
+            if self.recheck is None:
+                return False
+        key, task = self.recheck
+        if task.step(PROVIDER_STEP):
+            self.recheck = None
+            if task.result is not None:
+                self.rechecked[key].append(task.result)
+        return True
+
+    def _start_recheck(self):
+        for key, settings in self.difficulty_levels.items():
+            if len(self.rechecked[key]) >= self.queue_size:
+                continue
+            size = (settings["grid_rows"], settings["grid_cols"], settings["colors"])
+            if not any(entry[0] == size for entry in self.generator.unknown_boards):
+                continue
+            task = self.generator.start_recheck(*size, timeout=self._candidate_timeout(*size))
+            return key, task
+        return None
+
+    def _stream_step(self, key):
+        """
+        key の難易度の iter_solvable_boards を1歩 (ソルバなら SOLVER_STEP_NODES 局面) 進める。
+        解けると確認できた盤面が出ればそれを、まだなら None を返す。
+        """
+        entry = self.streams.get(key)
+        if entry is None:
+            settings = self.difficulty_levels[key]
+            clock = StepClock()
+            stream = self.generator.iter_solvable_boards(
+                rows=settings["grid_rows"],
+                cols=settings["grid_cols"],
+                colors=settings["colors"],
+                timeout=self.timeout,
+                yield_steps=True,
+                clock=clock
+            )
+            entry = self.streams[key] = (stream, clock)
+        stream, clock = entry
+        clock.start()
+        try:
+            return next(stream)
+        finally:
+            clock.stop()
+
+    def _run(self):
+        while not self.stopped:
+            self.active.wait()
+            if self.stopped:
+                break
+            key = self._next_key()
+            if key is None:
+                # 作り置きがそろっていれば、時間切れだった盤面の判定の続きをする
+                if not self._recheck_step():
+                    time.sleep(0.1)
+                continue
+
+            if self.rechecked[key]:
+                board = self.rechecked[key].popleft()
+            else:
+                # 少し進めるごとに戻ってきて、一時停止・終了を確かめる
+                board = self._stream_step(key)
+                if board is None:
+                    continue
+            with self.lock:
+                self.ready[key].append(board)
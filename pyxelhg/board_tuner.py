@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import platform
+import time
+
+from board_generator import BOARD_PARAMS_PATH, BoardGenerator, _singleton_cells, params_key
+from difficulty import DIFFICULTY_LEVELS
+
+# --------------------------------------------------
+#  生成パラメータの自動調整
+#  難易度ごとに「大きめブロック」方式のブロックの大きさと、候補1枚の判定時間を
+#  いくつか試し、解ける盤面が1秒あたり一番多く作れた組を assets/board_params.json に書く。
+#  BoardGenerator は起動時にこのファイルを読む (generation_params)。
+#  まずブロックの大きさを決め、次にその大きさで判定時間を決める。
+#  ブロックを大きくするほど速く作れるが簡単な盤面になるので、できた盤面の
+#  孤立セルの割合が従来の値より tolerance 以上減る組は選ばない
+# --------------------------------------------------
+
+MIN_BLOCK_SIZES = (1, 2, 3)
+MAX_BLOCK_SIZE = 3
+CANDIDATE_TIMEOUTS = (0.25, 0.5, 1.0, 2.0, 3.0)
+
+
+def measure(rows, cols, colors, params, seconds=10.0, seed=0):
+    """
+    params で iter_solvable_boards を seconds 秒ほど回し、結果の辞書を返す。
+    1枚の途中で seconds を過ぎた場合は、その1枚が出るまで待ってから割る。
+    """
+    generator = BoardGenerator(board_params={params_key(rows, cols, colors): params})
+    stream = generator.iter_solvable_boards(rows, cols, colors, seed=seed)
+    started = time.perf_counter()
+    boards = 0
+    singletons = 0
+    while time.perf_counter() - started < seconds:
+        board = next(stream)
+        boards += 1
+        singletons += len(_singleton_cells(board, generator.EMPTY))
+    elapsed = time.perf_counter() - started
+    return {
+        "params": dict(params),
+        "boards": boards,
+        "seconds": elapsed,
+        "boards_per_sec": boards / elapsed,
+        # 難しさの目安: できた盤面のうち、どの塊にも入っていないセルの割合
+        "singleton_rate": singletons / (boards * rows * cols),
+        "counts": dict(generator.last_pipeline_stats.counts),
+    }
+
+
+def block_size_options(rows):
+    return [(low, high) for low in MIN_BLOCK_SIZES
+            for high in range(max(low, 2), MAX_BLOCK_SIZE + 1)
+            if high <= rows]
+
+
+def tune_preset(rows, cols, colors, seconds=10.0, seed=0, timeouts=CANDIDATE_TIMEOUTS,
+                tolerance=0.2):
+    """
+    (rows, cols, colors) の生成パラメータを選ぶ。
+    従来のパラメータで作った盤面の孤立セルの割合を基準にし、それより
+    tolerance (割合) 以上簡単になる組は速くても選ばない。
+    戻り値は (選んだパラメータの結果, 試したすべての結果)。
+    """
+    generator = BoardGenerator(board_params={})
+    params = generator.generation_params(rows, cols, colors)
+    params["candidate_timeout"] = 1.0
+    trials = []
+
+    def run(candidate):
+        result = measure(rows, cols, colors, candidate, seconds, seed)
+        trials.append(result)
+        print(f"  {candidate}: {result['boards_per_sec']:.2f} boards/s "
+              f"({result['boards']} boards, singletons {result['singleton_rate']:.1%})")
+        return result
+
+    best = run(params)
+    floor = best["singleton_rate"] * (1 - tolerance)
+
+    def consider(candidate):
+        nonlocal best
+        result = run(candidate)
+        if result["singleton_rate"] < floor:
+            print("    (too easy, skipped)")
+        elif result["boards_per_sec"] > best["boards_per_sec"]:
+            best = result
+
+    for low, high in block_size_options(rows):
+        if (low, high) != (params["min_block_size"], params["max_block_size"]):
+            consider(dict(params, min_block_size=low, max_block_size=high))
+
+    chosen = best["params"]
+    for timeout in timeouts:
+        if timeout != chosen["candidate_timeout"]:  # ブロックの大きさを選んだときに測っている
+            consider(dict(chosen, candidate_timeout=timeout))
+    return best, trials
+
+
+def save_params(path, params, config):
+    """
+    params ({"RxCxK": {...}}) を path に書く。ほかの大きさの既存の値は残す。
+    """
+    data = {"presets": {}}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    data.setdefault("presets", {}).update(params)
+    data["config"] = config
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune board generation parameters")
+    parser.add_argument("--presets", nargs="+", choices=list(DIFFICULTY_LEVELS),
+                        help="difficulty presets to tune (default: all)")
+    parser.add_argument("--seconds", type=float, default=10.0,
+                        help="seconds to measure each parameter set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="how much lower the singleton-cell rate may get "
+                             "than with the built-in parameters")
+    parser.add_argument("--out", default=BOARD_PARAMS_PATH, help="JSON output file")
+
+    args = parser.parse_args(argv)
+    chosen = {}
+    for key in args.presets or DIFFICULTY_LEVELS:
+        settings = DIFFICULTY_LEVELS[key]
+        rows, cols, colors = settings["grid_rows"], settings["grid_cols"], settings["colors"]
+        print(f"{key} ({rows}x{cols}x{colors})")
+        best, _ = tune_preset(rows, cols, colors, seconds=args.seconds, seed=args.seed,
+                              tolerance=args.tolerance)
+        print(f"  -> {best['params']} ({best['boards_per_sec']:.2f} boards/s)")
+        chosen[params_key(rows, cols, colors)] = best["params"]
+
+    config = {"seconds": args.seconds, "seed": args.seed, "tolerance": args.tolerance,
+              "python": platform.python_version()}
+    save_params(args.out, chosen, config)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
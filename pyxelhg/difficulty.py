@@ -0,0 +1,9 @@
+# 難易度ごとの盤面の大きさ・色数・制限時間・スコア倍率
+# ゲーム本体 (main.py) と、pyxel なしで動かすツール (board_benchmark.py など) の両方から使う
+DIFFICULTY_LEVELS = {
+    "easy": {"grid_rows": 5, "grid_cols": 5, "colors": 3, "time_limit": None, "score_multiplier": 1.0},
+    "normal": {"grid_rows": 6, "grid_cols": 8, "colors": 4, "time_limit": None, "score_multiplier": 1.2},
+    "hard": {"grid_rows": 9, "grid_cols": 12, "colors": 5, "time_limit": 108, "score_multiplier": 1.5},
+    "very_hard": {"grid_rows": 10, "grid_cols": 15, "colors": 5, "time_limit": 54, "score_multiplier": 2.0},
+    "expert": {"grid_rows": 12, "grid_cols": 18, "colors": 5, "time_limit": 27, "score_multiplier": 3.0},
+}
@@ -0,0 +1,81 @@
+from board_generator import BoardGenerator
+
+
+class HintEngine:
+    """
+    プレイ中の盤面で「次の一手」のおすすめを裏で探す。
+    探索は BoardGenerator のパースコア探索 (ビームサーチ) を時間を区切って使い、
+    その最初の手をヒントにする。結果は盤面ごとに覚えておくので、同じ盤面なら探し直さない。
+    探索は update() で毎フレーム frame_budget 秒ずつ進める。スレッドで回すと
+    GIL を取り合ってフレームが落ちるので、デスクトップ版でも Web 版と同じく
+    メインループの中で少しずつ進める。
+    """
+
+    def __init__(self, time_budget=0.5, beam_width=8, frame_budget=0.004, cache_size=256):
+        """
+        time_budget: 1つの盤面の探索にかける最大秒数 (探索に使った時間で数える)
+        beam_width: ビームサーチの最初の幅
+        frame_budget: 1フレームで探索に使う秒数
+        cache_size: 覚えておく盤面の数 (超えたら古いものから捨てる)
+        """
+        self.time_budget = time_budget
+        self.beam_width = beam_width
+        self.frame_budget = frame_budget
+        self.cache_size = cache_size
+        # ゲーム側の BoardGenerator とは別に持つ (置換表などを汚さないため)
+        self.generator = BoardGenerator()
+        self.cache = {}  # 盤面 → おすすめの手 (r, c)、手がなければ None
+        self.task = None  # update() で進める探索 (盤面, ResumableTask)
+        self.key = None  # 今の盤面
+
+    @staticmethod
+    def board_key(board):
+        return tuple(tuple(row) for row in board)
+
+    def request(self, board, score_multiplier=1.0):
+        """
+        board (色番号の2次元リスト、空セルは -1) のおすすめを探し始める。
+        すでに答えがある盤面なら何もしない。探索中の別の盤面は取り消す。
+        """
+        key = self.board_key(board)
+        if key in self.cache:
+            self.key = key
+            return
+        self.cancel()
+        self.key = key
+        task = self.generator.start_par_search(
+            board, score_multiplier=score_multiplier,
+            time_budget=self.time_budget, beam_width=self.beam_width)
+        self.task = (key, task)
+
+    def cancel(self):
+        """
+        探索中のヒントを取り消す (盤面が変わったとき)。次の request() までは hint() は None。
+        """
+        self.key = None
+        if self.task is not None:
+            self.task[1].cancel()
+            self.task = None
+
+    def update(self):
+        """
+        毎フレーム呼ぶ。探索中なら frame_budget 秒ぶん進める。
+        """
+        if self.task is None:
+            return
+        key, task = self.task
+        if task.step(self.frame_budget):
+            self.task = None
+            self._store(key, task.result)
+
+    def hint(self):
+        """
+        今の盤面のおすすめの手 (r, c)。まだ探索中か、手がなければ None。
+        """
+        return self.cache.get(self.key)
+
+    def _store(self, key, result):
+        moves, _ = result
+        self.cache[key] = moves[0] if moves else None
+        while len(self.cache) > self.cache_size:
+            del self.cache[next(iter(self.cache))]
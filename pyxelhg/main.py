@@ -13,6 +13,11 @@ import copy
 import pyxel
 from enum import Enum
 from board_generator import BoardGenerator
+from board_provider import BoardProvider
+from board_catalog import BoardCatalog, shard_paths
+from board_library import BoardLibrary, library_filename
+from difficulty import DIFFICULTY_LEVELS
+from hint_engine import HintEngine
 from bgm import BGMGenerator
 
 # 定数の設定
@@ -26,6 +31,8 @@ BUTTON_SPACING = 10
 BUTTON_AREA_HEIGHT = 40  # ボタンエリアの高さ（縦にボタンを並べるため拡大）
 STATUS_AREA_HEIGHT = 30   # 表示エリアの高さ
 
+BOARD_GENERATION_FRAME_BUDGET = 0.008  # 盤面生成に1フレームで使う秒数 (30fps の1/4程度)
+
 # 色覚多様性対応
 #COLORS = [1, 4, 3, 6, 2]  # rev02
 #COLORS = [GREEN, ORANGE, PURPLE, BLUE, RED]  # rev03
@@ -592,13 +599,7 @@ class SameGame:
         self.setup_sounds()
 
         # 難易度設定
-        self.difficulty_levels = {
-            "easy": {"grid_rows": 5, "grid_cols": 5, "colors": 3, "time_limit": None, "score_multiplier": 1.0},
-            "normal": {"grid_rows": 6, "grid_cols": 8, "colors": 4, "time_limit": None, "score_multiplier": 1.2},
-            "hard": {"grid_rows": 9, "grid_cols": 12, "colors": 5, "time_limit": 108, "score_multiplier": 1.5},
-            "very_hard": {"grid_rows": 10, "grid_cols": 15, "colors": 5, "time_limit": 54, "score_multiplier": 2.0},
-            "expert": {"grid_rows": 12, "grid_cols": 18, "colors": 5, "time_limit": 27, "score_multiplier": 3.0},
-        }
+        self.difficulty_levels = DIFFICULTY_LEVELS
         self.current_difficulty = "easy"
         self.update_difficulty_settings()
 
@@ -611,9 +612,22 @@ class SameGame:
 
         # 盤面設定
         self.board_generator = BoardGenerator()
+        self.board_generation_task = None  # フレームごとに進める盤面生成
         self.initial_grid = []
         self.grid = []
 
+        # 作成済みの盤面ライブラリ ((rows, cols, colors) ごとに読み込む)
+        self.board_libraries = {}
+
+        # メニュー画面の間に全難易度の盤面を作り置きする
+        self.board_provider = BoardProvider(self.difficulty_levels)
+        self.board_provider.start()
+
+        # 次の一手のおすすめ (H キーで表示)
+        self.hint_engine = HintEngine()
+        self.hint_requested = False  # 今の盤面の探索を始めたか
+        self.show_hint = False
+
         # ボタン設定
         self.difficulty_buttons = []
         self.create_difficulty_buttons()
@@ -667,6 +681,31 @@ class SameGame:
             raise FileNotFoundError(f"Font file not found: {absolute_path}")
         return pyxel.Font(absolute_path)
 
+    def load_board_library(self, rows, cols, colors):
+        """
+        assets/board_library にある盤面ライブラリを読み込む。なければ
+        assets/board_catalog/RxCxK のシャード (board_catalog.py で作ったもの) をまとめて読む。
+        どちらもなければ None。
+        """
+        key = (rows, cols, colors)
+        if key not in self.board_libraries:
+            path = os.path.join(self.base_path, "assets", "board_library",
+                                library_filename(rows, cols, colors))
+            shards = shard_paths(os.path.join(self.base_path, "assets", "board_catalog",
+                                              f"{rows}x{cols}x{colors}"),
+                                 rows, cols, colors)
+            library = None
+            if os.path.exists(path) or shards:
+                try:
+                    if os.path.exists(path):
+                        library = BoardLibrary(path)
+                    else:
+                        library = BoardCatalog(shards)
+                except (OSError, ValueError) as e:
+                    print(f"[ERROR] 盤面ライブラリを読み込めませんでした: {e}")
+            self.board_libraries[key] = library
+        return self.board_libraries[key]
+
     def load_json(self, relative_path) -> dict:
         """JSONファイルを絶対パスで読み込む"""
         absolute_path = os.path.join(self.base_path, relative_path)
@@ -994,6 +1033,12 @@ class SameGame:
         # A. 今のステートに応じて行うゲームロジック（難易度選択・スコア更新など）
 #        print(f"in update func: {self.state}")  # デバッグ用
         self.handle_current_state()
+
+        # 盤面の作り置きはメニュー画面の間だけ進める
+        if self.state in [GameState.OPENING, GameState.DIFFICULTY_SELECTION]:
+            self.board_provider.resume()
+        else:
+            self.board_provider.pause()
     
         # B. ゲームステートやアニメフラグに応じたブロックアニメ更新
         self.handle_animations()
@@ -1084,13 +1129,31 @@ class SameGame:
         
             if not self.board_generated:
 
-                # 盤面を新たに生成（リセットはタイミングに応じて）
-                self.generate_new_board(use_saved_initial_state=False)
-                
-                # スコアやタイマーはここでリセットしたい場合に呼ぶ
-                self.reset_game_state()
-                
-                self.board_generated = True
+                # 用意済みの盤面がなければ、毎フレーム少しずつ生成を進める（画面を止めない）
+                # timeout は生成に使った時間で数えるので、フレームの合間の待ち時間は含まない
+                int_grid = None
+                if self.board_generation_task is None:
+                    int_grid = self.take_prepared_board()
+                    if int_grid is None:
+                        self.board_generation_task = self.board_generator.start_generation(
+                            rows=self.grid_rows,
+                            cols=self.grid_cols,
+                            colors=self.num_colors,
+                            timeout=3
+                        )
+                task = self.board_generation_task
+                if task is not None and task.step(BOARD_GENERATION_FRAME_BUDGET):
+                    int_grid = task.result
+                    self.board_generation_task = None
+
+                if int_grid is not None:
+                    # 盤面を新たに生成（リセットはタイミングに応じて）
+                    self.generate_new_board(use_saved_initial_state=False, int_grid=int_grid)
+                    
+                    # スコアやタイマーはここでリセットしたい場合に呼ぶ
+                    self.reset_game_state()
+                    
+                    self.board_generated = True
  
             else:
                 # 生成が完了したら次のステートへ移行
@@ -1129,6 +1192,13 @@ class SameGame:
             # 共通ゲーム進行処理
             if pyxel.btnp(pyxel.MOUSE_BUTTON_LEFT):
                 self.handle_click(mx, my)
+            # 盤面が落ち着いたら、次の一手のおすすめを裏で探し始める
+            if not self.is_falling and not self.is_shifting and not self.hint_requested:
+                self.hint_engine.request(self.grid_colors(), self.score_multiplier)
+                self.hint_requested = True
+            if pyxel.btnp(pyxel.KEY_H):
+                self.show_hint = not self.show_hint
+            self.hint_engine.update()
             if self.time_limit and pyxel.frame_count - self.start_time > self.time_limit * 30:
                 self.state = GameState.TIME_UP
             if not self.is_falling and not self.is_shifting:
@@ -1273,6 +1343,11 @@ class SameGame:
             # 消去処理
             blocks_to_remove = self.find_connected_blocks(x, y, color)
             if len(blocks_to_remove) > 1:
+                # 盤面が変わるので、探索中のヒントは取り消す
+                self.hint_engine.cancel()
+                self.hint_requested = False
+                self.show_hint = False
+
                 # 今回の消去で得られるスコアを一時変数に入れる
                 points_gained = int(len(blocks_to_remove) 
                                     * (len(blocks_to_remove) ** 2) 
@@ -1409,21 +1484,38 @@ class SameGame:
         # BGM停止などが必要であればここに入れる
         self.stop_bgm()
 
-    def generate_new_board(self, use_saved_initial_state=False):
+    def take_prepared_board(self):
+        """
+        盤面ライブラリ → 作り置きの順に、すぐ使える盤面を探す。なければ None。
+        """
+        library = self.load_board_library(self.grid_rows, self.grid_cols, self.num_colors)
+        if library:
+            int_grid = library.board_for_seed(random.getrandbits(32))
+            if int_grid is not None:
+                return int_grid
+        return self.board_provider.take(self.current_difficulty)
+
+    def generate_new_board(self, use_saved_initial_state=False, int_grid=None):
         # ここで先にセルサイズ等を更新
         self.cell_size, self.grid_x_start, self.grid_y_start = self.get_grid_layout()
+        self.hint_engine.cancel()
+        self.hint_requested = False
+        self.show_hint = False
 
         if use_saved_initial_state and hasattr(self, 'initial_grid'):
             # すでに保存済みの Block 配列があるなら、それを deepcopy で再現
             self.grid = copy.deepcopy(self.initial_grid)
         else:
-            # まずは BoardGenerator で「色番号の2次元リスト」を取得
-            int_grid = self.board_generator.generate_filled_solvable_board(
-                rows=self.grid_rows,
-                cols=self.grid_cols,
-                colors=self.num_colors,
-                timeout=3
-            )
+            # 渡された盤面 → 用意済みの盤面 → BoardGenerator の順に「色番号の2次元リスト」を取得
+            if int_grid is None:
+                int_grid = self.take_prepared_board()
+            if int_grid is None:
+                int_grid = self.board_generator.generate_filled_solvable_board(
+                    rows=self.grid_rows,
+                    cols=self.grid_cols,
+                    colors=self.num_colors,
+                    timeout=3
+                )
     
             # これを「Block (または None) の2次元リスト」に変換
             block_grid = []
@@ -1445,6 +1537,13 @@ class SameGame:
             self.grid = block_grid
             self.initial_grid = copy.deepcopy(self.grid)  # 保存
 
+    def grid_colors(self):
+        """
+        今の盤面を色番号の2次元リスト (空セルは -1) で返す。
+        """
+        return [[block.color if block is not None else -1 for block in row]
+                for row in self.grid]
+
     def all_blocks_stopped(self):
         """
         全ブロックの (x, y) が (target_x, target_y) に到達していれば True を返す
@@ -1694,12 +1793,23 @@ class SameGame:
     def draw_board_generation(self):
         self.draw_translated_text("board_generation", self.current_language)
 
+        # 生成中も止まって見えないよう、ブロックを順に光らせる
+        count = len(COLORS)
+        size = 6
+        spacing = 4
+        x = (WINDOW_WIDTH - (count * (size + spacing) - spacing)) // 2
+        active = (pyxel.frame_count // 6) % count
+        for i in range(count):
+            color = COLORS[i] if i == active else pyxel.COLOR_NAVY
+            pyxel.rect(x + i * (size + spacing), 140, size, size, color)
+
 
     def draw_gameplay(self):
         # 盤面とボタン・ステータスを描画
         self.draw_game_buttons()
         self.draw_difficulty_label()
         self.draw_grid()
+        self.draw_hint()
         self.draw_score_and_time()
 
     def draw_end_message(self):
@@ -1819,6 +1929,24 @@ class SameGame:
                 if block is not None:
                     block.draw()
 
+    def draw_hint(self):
+        """
+        おすすめの手の塊を点滅する枠で囲む。
+        """
+        if not self.show_hint or self.is_falling or self.is_shifting:
+            return
+        move = self.hint_engine.hint()
+        if move is None:
+            return
+        row, col = move
+        block = self.grid[row][col]
+        if block is None:
+            return
+        color = pyxel.COLOR_WHITE if pyxel.frame_count // 8 % 2 else pyxel.COLOR_BLACK
+        for x, y in self.find_connected_blocks(col, row, block.color):
+            target = self.grid[y][x]
+            pyxel.rectb(int(target.x), int(target.y), target.cell_size, target.cell_size, color)
+
     def get_grid_layout(self):
         """
         グリッドを描画・クリックする際の cell_size / grid_x_start / grid_y_start を統一計算する